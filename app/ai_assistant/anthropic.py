@@ -1,49 +1,45 @@
-from typing import Dict, List
+from typing import Dict
 import anthropic
 from .base import AIAssistant
 
 class ClaudeAssistant(AIAssistant):
+    provider = "anthropic"
+
     def __init__(self, config_path: str):
         super().__init__(config_path)
         self.client = anthropic.Anthropic(
             api_key=self.config["anthropic"]["api_key"]
         )
+        self.async_client = anthropic.AsyncAnthropic(
+            api_key=self.config["anthropic"]["api_key"]
+        )
         self.model = self.config["anthropic"]["model"]
+        # Cache breakpoint after the static prefix. It only takes effect once the prefix
+        # reaches the model's minimum (1024 tokens, 2048 on Haiku); below that it is ignored
+        self.system = [{"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}}]
 
-    def analyze_page_structure(self, html_content: str) -> Dict:
-        prompt = f"""
-        Analyze this HTML content and identify key structural elements:
-        {html_content[:2000]}...
-        
-        Return a JSON structure describing:
-        1. Main content areas
-        2. Navigation elements
-        3. Data containers
-        4. Pagination elements
-        """
-        
+    def _complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
         response = self.client.messages.create(
             model=self.model,
-            max_tokens=1000,
-            temperature=0.7,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=self.system,
             messages=[{"role": "user", "content": prompt}]
         )
-        
-        return self._parse_response(response.content)
+        return self._remember(prompt, self._response_text(response.content), self._token_usage(response))
 
-    def generate_selectors(self, target_data_description: str, page_structure: Dict) -> List[str]:
-        prompt = f"""
-        Generate CSS selectors to extract {target_data_description} from a page with this structure:
-        {page_structure}
-        
-        Return a list of precise CSS selectors.
-        """
-        
-        response = self.client.messages.create(
+    async def _complete_async(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self.async_client.messages.create(
             model=self.model,
-            max_tokens=500,
-            temperature=0.2,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=self.system,
             messages=[{"role": "user", "content": prompt}]
         )
-        
-        return self._parse_selectors(response.content) 
\ No newline at end of file
+        return self._remember(prompt, self._response_text(response.content), self._token_usage(response))
+
+    def _token_usage(self, response) -> Dict:
+        return self._usage(
+            response.usage, 'input_tokens', 'output_tokens',
+            'cache_creation_input_tokens', 'cache_read_input_tokens'
+        )
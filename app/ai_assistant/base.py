@@ -1,41 +1,387 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+import asyncio
+import atexit
+import gzip
 import json
-from typing import Dict, List, Optional
+import queue
+import re
+import threading
+import weakref
+from typing import Dict, Iterator, List, Optional
+
+# Instructions and response formats for every task. Providers send this first and
+# byte-for-byte identical on every call, so it can be cached as a prompt prefix;
+# per-call prompts only name the task and carry the page or record data. It is kept
+# short: below a provider's cache minimum (1024 tokens for Anthropic and OpenAI) it is
+# not cached, and every token of it is processed on every call.
+SYSTEM_PROMPT = """You are the analysis component of a web scraper. Each request names
+one of the tasks below and supplies its data. Follow the task's instructions and
+answer in exactly the format it asks for.
+
+Task: page structure
+Analyze the HTML content and identify its key structural elements.
+Return a JSON object describing:
+1. Main content areas
+2. Navigation elements
+3. Data containers
+4. Pagination elements
+When several HTML pages are given, return a JSON array with one such object per
+page, in the order the pages were given.
+
+Task: selectors
+Generate CSS selectors that extract the described target data from a page with the
+given structure. Return a JSON list of precise CSS selectors: the first selects
+the rows, the second the columns within a row, the third the thumbnail image.
+
+Task: validation
+Check the scraped records for missing fields, wrong types and values that look
+like they came from the wrong element.
+Return JSON: {"valid": true or false, "message": "short explanation"}
+When several pages of records are given, return a JSON array with one such object
+per page, in the order the pages were given.
+
+Task: patterns
+Compare the structures of several pages of one site and identify what they share.
+Return a JSON object with "selectors", "structures" and "navigation", each mapping
+a short pattern name to the selector or description it stands for.
+
+Task: guidance
+Answer the user's question about scraping a website, such as authentication,
+cookies or required headers, with short, concrete steps in plain text.
+"""
+
+class _HistoryWriter:
+    """Appends exchanges to one gzip JSON-lines stream from a background thread"""
+
+    def __init__(self, path: str):
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, entry: Dict):
+        self._queue.put(entry)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            self._file.write(json.dumps(entry, default=str) + '\n')
+            if self._queue.empty():
+                # A sync point: everything up to here can be read back after a crash
+                self._file.flush()
+        self._file.close()
 
 class AIAssistant(ABC):
+    # Config section for the provider (e.g. "anthropic"); also keys the concurrency limit
+    provider: Optional[str] = None
+    default_max_concurrency = 4
+    default_history_limit = 200
+    system_prompt = SYSTEM_PROMPT
+
+    # Event loop -> provider -> semaphore, shared by every assistant of a provider
+    _semaphores = weakref.WeakKeyDictionary()
+
     def __init__(self, config_path: str):
         self.config = self._load_config(config_path)
-        self.conversation_history = []
+        # Only the most recent exchanges are kept in memory; set history_path to keep them all
+        self.conversation_history = deque(maxlen=self.config.get('history_limit', self.default_history_limit))
+        self.history_path = self.config.get('history_path')
+        self._history_lock = threading.Lock()
+        self._history_writer = _HistoryWriter(self.history_path) if self.history_path else None
+        provider_config = self.config.get(self.provider, {}) if self.provider else {}
+        self.max_concurrency = provider_config.get('max_concurrency', self.default_max_concurrency)
 
-    @abstractmethod
     def analyze_page_structure(self, html_content: str) -> Dict:
         """Analyze webpage structure and identify key elements"""
-        pass
+        return self._parse_response(self._complete(self._structure_prompt(html_content), 1000, 0.7))
 
-    @abstractmethod
     def generate_selectors(self, target_data_description: str, page_structure: Dict) -> List[str]:
         """Generate CSS/XPath selectors based on target data description"""
-        pass
+        prompt = self._selectors_prompt(target_data_description, page_structure)
+        return self._parse_selectors(self._complete(prompt, 500, 0.2))
 
-    @abstractmethod
     def guide_user(self, context: str) -> str:
         """Generate guidance for the user based on context"""
-        pass
+        return self._complete(self._guidance_prompt(context), 1000, 0.7)
 
-    @abstractmethod
     def validate_data(self, scraped_data: List[Dict]) -> tuple[bool, str]:
         """Validate scraped data quality and structure"""
+        return self._parse_validation(self._complete(self._validation_prompt(scraped_data), 500, 0.2))
+
+    def identify_patterns(self, page_structures: List[Dict], batch_size: int = 8) -> Dict:
+        """Blocking wrapper around identify_patterns_async"""
+        return asyncio.run(self.identify_patterns_async(page_structures, batch_size))
+
+    @abstractmethod
+    def _complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Send a prompt to the provider and return the response text"""
         pass
 
+    async def _complete_async(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Async completion; providers override this with their async client"""
+        return await asyncio.to_thread(self._complete, prompt, max_tokens, temperature)
+
+    async def analyze_page_structure_async(self, html_content: str) -> Dict:
+        async with self._async_slot():
+            text = await self._complete_async(self._structure_prompt(html_content), 1000, 0.7)
+        return self._parse_response(text)
+
+    async def generate_selectors_async(self, target_data_description: str, page_structure: Dict) -> List[str]:
+        async with self._async_slot():
+            text = await self._complete_async(
+                self._selectors_prompt(target_data_description, page_structure), 500, 0.2
+            )
+        return self._parse_selectors(text)
+
+    async def guide_user_async(self, context: str) -> str:
+        async with self._async_slot():
+            return await self._complete_async(self._guidance_prompt(context), 1000, 0.7)
+
+    async def validate_data_async(self, scraped_data: List[Dict]) -> tuple[bool, str]:
+        async with self._async_slot():
+            text = await self._complete_async(self._validation_prompt(scraped_data), 500, 0.2)
+        return self._parse_validation(text)
+
+    async def identify_patterns_async(self, page_structures: List[Dict], batch_size: int = 8) -> Dict:
+        """Find patterns shared across pages; batches run concurrently and are merged"""
+        async def run_batch(batch: List[Dict]) -> Dict:
+            async with self._async_slot():
+                text = await self._complete_async(self._patterns_prompt(batch), 1000, 0.2)
+            return self._parse_response(text)
+
+        batches = [page_structures[i:i + batch_size] for i in range(0, len(page_structures), batch_size)]
+        patterns = {'selectors': {}, 'structures': {}, 'navigation': {}}
+        for found in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+            for key, value in found.items():
+                if isinstance(value, dict) and isinstance(patterns.get(key), dict):
+                    patterns[key].update(value)
+                else:
+                    patterns.setdefault(key, value)
+        return patterns
+
+    async def analyze_pages_batch_async(self, html_pages: List[str], batch_size: int = 4) -> List[Dict]:
+        """Analyze several pages, packing up to batch_size pages into each call"""
+        async def run_batch(batch: List[str]) -> List[Dict]:
+            async with self._async_slot():
+                text = await self._complete_async(
+                    self._batch_structure_prompt(batch), 1000 * len(batch), 0.7
+                )
+            results = self._parse_batch(text, len(batch))
+            if results is None:
+                # The model did not answer per page; fall back to one call each
+                return list(await asyncio.gather(
+                    *(self.analyze_page_structure_async(html) for html in batch)
+                ))
+            return [r if isinstance(r, dict) else {'raw': r} for r in results]
+
+        batches = [html_pages[i:i + batch_size] for i in range(0, len(html_pages), batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [structure for batch in results for structure in batch]
+
+    async def validate_data_batch_async(self, pages_data: List[List[Dict]],
+                                        batch_size: int = 4) -> List[tuple[bool, str]]:
+        """Validate several pages of records, packing up to batch_size pages into each call"""
+        async def run_batch(batch: List[List[Dict]]) -> List[tuple[bool, str]]:
+            async with self._async_slot():
+                text = await self._complete_async(
+                    self._batch_validation_prompt(batch), 300 * len(batch), 0.2
+                )
+            results = self._parse_batch(text, len(batch))
+            if results is None:
+                return list(await asyncio.gather(*(self.validate_data_async(data) for data in batch)))
+            return [self._parse_validation(json.dumps(r)) for r in results]
+
+        batches = [pages_data[i:i + batch_size] for i in range(0, len(pages_data), batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [verdict for batch in results for verdict in batch]
+
+    def analyze_pages_batch(self, html_pages: List[str], batch_size: int = 4) -> List[Dict]:
+        """Blocking wrapper around analyze_pages_batch_async"""
+        return asyncio.run(self.analyze_pages_batch_async(html_pages, batch_size))
+
+    def validate_data_batch(self, pages_data: List[List[Dict]], batch_size: int = 4) -> List[tuple[bool, str]]:
+        """Blocking wrapper around validate_data_batch_async"""
+        return asyncio.run(self.validate_data_batch_async(pages_data, batch_size))
+
+    def _async_slot(self) -> asyncio.Semaphore:
+        """Per-provider semaphore bounding concurrent calls on the running loop"""
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(loop, {})
+        key = self.provider or type(self).__name__
+        if key not in semaphores:
+            semaphores[key] = asyncio.Semaphore(self.max_concurrency)
+        return semaphores[key]
+
+    def _structure_prompt(self, html_content: str) -> str:
+        return f"Task: page structure\n\nHTML content:\n{html_content[:2000]}..."
+
+    def _selectors_prompt(self, target_data_description: str, page_structure: Dict) -> str:
+        return (
+            f"Task: selectors\n\nTarget data: {target_data_description}\n\n"
+            f"Page structure:\n{page_structure}"
+        )
+
+    def _guidance_prompt(self, context: str) -> str:
+        return f"Task: guidance\n\n{context}"
+
+    def _validation_prompt(self, scraped_data: List[Dict]) -> str:
+        return (
+            f"Task: validation\n\nRecords:\n"
+            f"{json.dumps(scraped_data[:20], indent=2, default=str)}"
+        )
+
+    def _batch_structure_prompt(self, html_pages: List[str]) -> str:
+        pages = "\n".join(
+            f"--- Page {i + 1} ---\n{html[:2000]}..." for i, html in enumerate(html_pages)
+        )
+        return f"Task: page structure\n\n{len(html_pages)} HTML pages:\n{pages}"
+
+    def _batch_validation_prompt(self, pages_data: List[List[Dict]]) -> str:
+        pages = "\n".join(
+            f"--- Page {i + 1} ---\n{json.dumps(data[:20], default=str)}"
+            for i, data in enumerate(pages_data)
+        )
+        return f"Task: validation\n\n{len(pages_data)} pages of records:\n{pages}"
+
+    def _patterns_prompt(self, page_structures: List[Dict]) -> str:
+        pages = "\n".join(
+            f"--- Page {i + 1} ---\n{json.dumps(structure, default=str)[:2000]}"
+            for i, structure in enumerate(page_structures)
+        )
+        return f"Task: patterns\n\n{len(page_structures)} page structures:\n{pages}"
+
+    @staticmethod
+    def _usage(usage, *fields) -> Dict:
+        """Token counts (including prompt-cache hits) from an SDK usage object"""
+        values = {field: getattr(usage, field, None) for field in fields}
+        return {field: value for field, value in values.items() if value is not None}
+
+    def _remember(self, prompt: str, response: str, usage: Optional[Dict] = None) -> str:
+        """Add an exchange to the bounded history (and history_path, if set); returns response"""
+        entry = {'time': datetime.now().isoformat(), 'provider': self.provider,
+                 'prompt': prompt, 'response': response}
+        if usage:
+            entry['usage'] = usage
+        with self._history_lock:
+            self.conversation_history.append(entry)
+        if self._history_writer is not None:
+            # Compressed and written on the writer's thread, never on the event loop
+            self._history_writer.write(entry)
+        return response
+
+    def close(self):
+        """Flush and close the history_path stream"""
+        if self._history_writer is not None:
+            self._history_writer.close()
+
+    @staticmethod
+    def _response_text(content) -> str:
+        # Anthropic returns a list of content blocks, the other SDKs plain text
+        if isinstance(content, list):
+            return "".join(getattr(block, 'text', str(block)) for block in content)
+        return content or ""
+
+    def _extract_json(self, content):
+        text = self._response_text(content)
+        match = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+        if match:
+            text = match.group(1)
+        for opener, closer in (('{', '}'), ('[', ']')):
+            start, end = text.find(opener), text.rfind(closer)
+            if start != -1 and end > start:
+                try:
+                    return json.loads(text[start:end + 1])
+                except json.JSONDecodeError:
+                    continue
+        return None
+
+    def _parse_response(self, content) -> Dict:
+        """Parse a JSON object out of a model response"""
+        parsed = self._extract_json(content)
+        if isinstance(parsed, dict):
+            return parsed
+        return {'raw': self._response_text(content)}
+
+    def _parse_selectors(self, content) -> List[str]:
+        """Parse a list of selectors out of a model response"""
+        text = self._response_text(content)
+        start, end = text.find('['), text.rfind(']')
+        if start != -1 and end > start:
+            try:
+                selectors = json.loads(text[start:end + 1])
+                if isinstance(selectors, list):
+                    return [str(s) for s in selectors]
+            except json.JSONDecodeError:
+                pass
+        selectors = []
+        for line in text.splitlines():
+            line = re.sub(r"^\s*(?:[-*]|\d+[.)])\s*", "", line).strip().strip('`"\',')
+            if line and not line.endswith(':'):
+                selectors.append(line)
+        return selectors
+
+    def _parse_validation(self, content) -> tuple[bool, str]:
+        parsed = self._extract_json(content)
+        if isinstance(parsed, dict) and 'valid' in parsed:
+            return bool(parsed['valid']), str(parsed.get('message', ''))
+        text = self._response_text(content)
+        return 'invalid' not in text.lower(), text.strip()
+
+    def _parse_batch(self, content, expected: int) -> Optional[List]:
+        text = self._response_text(content)
+        start, end = text.find('['), text.rfind(']')
+        if start == -1 or end <= start:
+            return None
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(parsed, list) or len(parsed) != expected:
+            return None
+        return parsed
+
     def _load_config(self, config_path: str) -> Dict:
         """Load AI service configuration"""
         with open(config_path, 'r') as f:
             return json.load(f)
 
     def save_conversation(self, output_path: str):
-        """Save conversation history for future reference"""
-        with open(output_path, 'w') as f:
-            json.dump(self.conversation_history, f, indent=2)
+        """Save conversation history for future reference
+
+        A path ending in .gz is written as gzip-compressed JSON lines, one
+        exchange per line; anything else as a JSON list.
+        """
+        with self._history_lock:
+            history = list(self.conversation_history)
+        if output_path.endswith('.gz'):
+            with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+                for entry in history:
+                    f.write(json.dumps(entry, default=str) + '\n')
+        else:
+            with open(output_path, 'w') as f:
+                json.dump(history, f, indent=2, default=str)
+
+    @staticmethod
+    def load_conversation(path: str) -> Iterator[Dict]:
+        """Stream exchanges back from a .gz history written by save_conversation or history_path"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except EOFError:
+                # Left open by a process that did not exit cleanly; read up to its last flush
+                return
 
     def get_required_elements(self, website_url: str) -> Dict:
         """Determine required elements for scraping (cookies, headers, etc.)"""
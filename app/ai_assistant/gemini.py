@@ -1,35 +1,34 @@
-from typing import Dict, List
+from typing import Dict
 import google.generativeai as genai
 from .base import AIAssistant
 
 class GeminiAssistant(AIAssistant):
+    provider = "gemini"
+
     def __init__(self, config_path: str):
         super().__init__(config_path)
         genai.configure(api_key=self.config["gemini"]["api_key"])
-        self.model = genai.GenerativeModel(self.config["gemini"]["model"])
+        # The short instruction prefix only: Gemini does not cache it (explicit context
+        # caching needs 32k tokens or more), so every token is processed on every call
+        self.model = genai.GenerativeModel(
+            self.config["gemini"]["model"], system_instruction=self.system_prompt
+        )
+
+    def _complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = self.model.generate_content(
+            prompt,
+            generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
+        )
+        return self._remember(prompt, response.text, self._token_usage(response))
 
-    def analyze_page_structure(self, html_content: str) -> Dict:
-        prompt = f"""
-        Analyze this HTML content and identify key structural elements:
-        {html_content[:2000]}...
-        
-        Return a JSON structure describing:
-        1. Main content areas
-        2. Navigation elements
-        3. Data containers
-        4. Pagination elements
-        """
-        
-        response = self.model.generate_content(prompt)
-        return self._parse_response(response.text)
+    async def _complete_async(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
+        )
+        return self._remember(prompt, response.text, self._token_usage(response))
 
-    def generate_selectors(self, target_data_description: str, page_structure: Dict) -> List[str]:
-        prompt = f"""
-        Generate CSS selectors to extract {target_data_description} from a page with this structure:
-        {page_structure}
-        
-        Return a list of precise CSS selectors.
-        """
-        
-        response = self.model.generate_content(prompt)
-        return self._parse_selectors(response.text) 
\ No newline at end of file
+    def _token_usage(self, response) -> Dict:
+        return self._usage(
+            getattr(response, 'usage_metadata', None), 'prompt_token_count', 'candidates_token_count'
+        )
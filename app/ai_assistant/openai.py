@@ -1,47 +1,45 @@
-from typing import Dict, List
+from typing import Dict
 import openai
 from .base import AIAssistant
 
 class OpenAIAssistant(AIAssistant):
+    provider = "openai"
+
     def __init__(self, config_path: str):
         super().__init__(config_path)
         openai.api_key = self.config["openai"]["api_key"]
+        self.async_client = openai.AsyncOpenAI(api_key=self.config["openai"]["api_key"])
         self.model = self.config["openai"]["model"]
 
-    def analyze_page_structure(self, html_content: str) -> Dict:
-        prompt = f"""
-        Analyze this HTML content and identify key structural elements:
-        {html_content[:2000]}...
-        
-        Return a JSON structure describing:
-        1. Main content areas
-        2. Navigation elements
-        3. Data containers
-        4. Pagination elements
-        """
-        
+    def _complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
         response = openai.chat.completions.create(
             model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1000
+            messages=[
+                # OpenAI caches identical prompt prefixes of 1024 tokens or more on its own
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
         )
-        
-        return self._parse_response(response.choices[0].message.content)
+        return self._remember(prompt, response.choices[0].message.content, self._token_usage(response))
 
-    def generate_selectors(self, target_data_description: str, page_structure: Dict) -> List[str]:
-        prompt = f"""
-        Generate CSS selectors to extract {target_data_description} from a page with this structure:
-        {page_structure}
-        
-        Return a list of precise CSS selectors.
-        """
-        
-        response = openai.chat.completions.create(
+    async def _complete_async(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self.async_client.chat.completions.create(
             model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=500
+            messages=[
+                # OpenAI caches identical prompt prefixes of 1024 tokens or more on its own
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
         )
-        
-        return self._parse_selectors(response.choices[0].message.content) 
\ No newline at end of file
+        return self._remember(prompt, response.choices[0].message.content, self._token_usage(response))
+
+    def _token_usage(self, response) -> Dict:
+        usage = self._usage(response.usage, 'prompt_tokens', 'completion_tokens')
+        details = getattr(response.usage, 'prompt_tokens_details', None)
+        if details is not None and getattr(details, 'cached_tokens', None) is not None:
+            usage['cached_tokens'] = details.cached_tokens
+        return usage
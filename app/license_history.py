@@ -0,0 +1,418 @@
+import argparse
+import json
+import os
+from datetime import datetime
+import requests
+from bs4 import BeautifulSoup
+import pandas as pd
+from contextlib import nullcontext
+from scraper.archive import ResponseArchive
+from scraper.pagination import PageRun, discover_pagination, fetch_pages
+from scraper.profiling import SamplingProfiler, stage, staged
+from scraper.records import RecordBuffer
+from scraper.result_store import ResultStore
+from scraper.streaming import LICENSE_COLUMNS, ChunkEdges, iter_rows, response_encoding
+from scraper.thumbnail_processing import DEFAULT_VARIANTS, ThumbnailProcessor, variant_field
+from scraper.thumbnail_store import ThumbnailStore
+from scraper.throttle import AdaptiveThrottle, fetch_with_backoff
+
+class AdobeStockScraper:
+    def __init__(self, data_dir="/data"):
+        self.session = requests.Session()
+        self.base_url = "https://stock.adobe.com"
+        self.license_history_url = f"{self.base_url}/Dashboard/LicenseHistory"
+        self.output_dir = os.path.join(data_dir, "output")
+        self.thumbnails_dir = os.path.join(data_dir, "thumbnails")
+        self.config_dir = "/app/config"
+        self.throttle = AdaptiveThrottle()
+        self.max_consecutive_failures = 3
+        self.failed_pages = []
+        # Optional ResultStore; when set, each page is upserted as it is scraped
+        self.result_store = None
+        # Optional ResponseArchive; when set, every fetched page body is recorded
+        self.archive = None
+        # Pagination model read from the first page by scrape_all_pages
+        self.pagination = None
+        
+        # Create directories if they don't exist
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.thumbnails_dir, exist_ok=True)
+        self.thumbnail_store = ThumbnailStore(self.thumbnails_dir)
+        migrated = self.thumbnail_store.import_flat_files()
+        if migrated:
+            print(f"Moved {migrated} thumbnails from {self.thumbnails_dir} into the thumbnail store")
+        
+        # Set up session headers
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5'
+        })
+        
+        # Load cookies from config
+        self.load_cookies()
+
+    def load_cookies(self):
+        """Load cookies from config/cookies.json"""
+        cookie_file = os.path.join(self.config_dir, 'cookies.json')
+        try:
+            with open(cookie_file, 'r') as f:
+                self.cookies = json.load(f)
+                print("Successfully loaded cookies from config file")
+        except FileNotFoundError:
+            print(f"Cookie file not found at {cookie_file}")
+            self.cookies = {}
+        except json.JSONDecodeError:
+            print(f"Error parsing cookie file at {cookie_file}")
+            self.cookies = {}
+
+    @stage('fetch')
+    def get_page(self, page_number=1):
+        """Fetch a single page of license history"""
+        params = self._page_params(page_number)
+        
+        response = fetch_with_backoff(
+            self.session,
+            self.license_history_url,
+            self.throttle,
+            cookies=self.cookies,
+            params=params
+        )
+        if self.archive is not None:
+            self.archive.record_response(response, page=page_number)
+        if self.pagination is not None:
+            self.pagination.observe(page_number, response.text, response.url)
+        return response.text
+
+    @stage('fetch')
+    def get_page_stream(self, page_number=1):
+        """Fetch a page of license history as raw byte chunks and their declared encoding"""
+        params = self._page_params(page_number)
+        
+        response = fetch_with_backoff(
+            self.session,
+            self.license_history_url,
+            self.throttle,
+            cookies=self.cookies,
+            params=params,
+            stream=True
+        )
+        chunks = response.iter_content(chunk_size=64 * 1024)
+        encoding = response_encoding(response)
+        if self.archive is not None:
+            chunks = self.archive.tee(
+                chunks, response.url, response.status_code, dict(response.headers), encoding,
+                page=page_number
+            )
+        return chunks, encoding
+
+    def _page_params(self, page_number):
+        if self.pagination is None:
+            return {'page': page_number}
+        return self.pagination.params(page_number)
+
+    def parse_stream(self, chunks, encoding=None):
+        """Parse license history rows incrementally, without building the full DOM"""
+        return iter_rows(chunks, LICENSE_COLUMNS, encoding=encoding)
+
+    @staticmethod
+    def parse_page(html_content):
+        """Parse the license history page content (HTML or an already parsed document)"""
+        if isinstance(html_content, BeautifulSoup):
+            soup = html_content
+        else:
+            soup = BeautifulSoup(html_content, 'lxml')
+        assets = []
+
+        # Find all asset rows in the table
+        for row in soup.select('tr:has(td)'):  # Select rows that contain td elements
+            try:
+                columns = row.select('td')
+                if len(columns) >= 6:
+                    asset = {
+                        'date': columns[0].text.strip(),
+                        'author': columns[1].text.strip(),
+                        'asset_id': columns[2].text.strip(),
+                        'license': columns[3].text.strip(),
+                        'media_type': columns[4].text.strip(),
+                        'price': columns[5].text.strip()
+                    }
+                    
+                    # Try to get thumbnail URL if available
+                    img = row.select_one('img')
+                    if img and img.get('src'):
+                        asset['thumbnail_url'] = img['src']
+                    
+                    assets.append(asset)
+            except Exception as e:
+                print(f"Error parsing row: {e}")
+                continue
+
+        return assets
+
+    @stage('thumbnail')
+    def download_thumbnail(self, url, asset_id, revalidate=False):
+        """Download thumbnail image for an asset into the thumbnail store"""
+        if not url:
+            return None
+            
+        entry = self.thumbnail_store.lookup(asset_id)
+        if entry and not revalidate:
+            return entry['path']
+        
+        # Conditional request so unchanged thumbnails are not downloaded again
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        try:
+            response = self.session.get(url, headers=headers)
+            if response.status_code == 304 and entry:
+                self.thumbnail_store.touch(asset_id)
+                return entry['path']
+            if response.status_code == 200:
+                return self.thumbnail_store.put(
+                    asset_id,
+                    response.content,
+                    url=url,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    content_type=response.headers.get('Content-Type')
+                )
+        except Exception as e:
+            print(f"Error downloading thumbnail for asset {asset_id}: {e}")
+        return None
+
+    def scrape_all_pages(self, max_pages=None, stream=False, parallel=True):
+        """Scrape all pages of license history
+
+        With stream=True each page is parsed incrementally from the response
+        bytes, so only its rows are held, never the document tree. With
+        parallel=True the page count is read from the first page and every
+        known page is fetched concurrently, within the throttle's limits;
+        pages beyond a known count are discovered one at a time.
+        """
+        all_assets = RecordBuffer()
+        run = PageRun(max_consecutive_failures=self.max_consecutive_failures)
+        self.failed_pages = run.failed_pages
+        self.pagination = None
+        
+        if parallel:
+            self._scrape_known_pages(all_assets, run, max_pages, stream)
+        if stream and self.pagination is not None and self.pagination.scheme == 'cursor':
+            # Cursors come from each page's next link, which needs the whole page
+            stream = False
+        
+        while (page := run.next_page()) is not None:
+            if not run.retrying:
+                if max_pages and page > max_pages:
+                    run.stop()
+                    continue
+                if self.pagination is not None and not self.pagination.has_page(page):
+                    run.stop()
+                    continue
+                print(f"Scraping page {page}...")
+            start = len(all_assets)
+            try:
+                all_assets.extend(self.scrape_page(page, stream))
+            except Exception as e:
+                # Drop rows of the partially parsed page
+                all_assets.truncate(start)
+                run.failed(page, e)
+                continue
+            run.succeeded(page, has_next=len(all_assets) > start)
+            self._store_page(all_assets, start)
+        
+        return all_assets
+
+    def _scrape_known_pages(self, all_assets, run, max_pages=None, stream=False):
+        """Scrape page 1, then every other page it accounts for, concurrently"""
+        try:
+            print("Scraping page 1...")
+            assets, first_page = self._read_first_page(stream)
+            all_assets.extend(self._with_thumbnails(assets))
+        except Exception as e:
+            all_assets.truncate(0)
+            run.failed(1, e)
+            return
+        if not all_assets:
+            run.stop()
+            return
+        self._store_page(all_assets, 0)
+        
+        self.pagination = discover_pagination(first_page, self.license_history_url, len(all_assets))
+        self.pagination.observe(1, first_page, self.license_history_url)
+        run.succeeded(1)
+        if not self.pagination.random_access:
+            return
+        
+        last = self.pagination.total_pages
+        if max_pages:
+            last = min(last, max_pages)
+        if last > 1:
+            print(f"Fetching pages 2-{last} of {self.pagination.total_pages} concurrently...")
+        fetch = lambda page: list(self.scrape_page(page, stream))
+        for page, assets, error in fetch_pages(fetch, range(2, last + 1), self.throttle.max_concurrency):
+            if error is not None:
+                run.failed_concurrently(page, error)
+                continue
+            start = len(all_assets)
+            all_assets.extend(assets)
+            self._store_page(all_assets, start)
+        
+        # A count read off windowed page links is only a lower bound
+        if self.pagination.exact or last == max_pages:
+            run.stop()
+        run.skip_to(last + 1)
+
+    def _read_first_page(self, stream=False):
+        """Page 1's assets, and what discover_pagination reads the page count from
+
+        Streamed, that is only the start and end of the body; otherwise it is
+        the document parse_page already built.
+        """
+        if stream:
+            chunks, encoding = self.get_page_stream(1)
+            edges = ChunkEdges(chunks)
+            assets = list(staged('parse', self.parse_stream(edges, encoding)))
+            return assets, edges.text(encoding)
+        html_content = self.get_page(1)
+        with stage('parse'):
+            soup = BeautifulSoup(html_content, 'lxml')
+            return self.parse_page(soup), soup
+
+    def scrape_page(self, page, stream=False):
+        """Fetch and parse one page, yielding assets with their thumbnails downloaded"""
+        if stream:
+            chunks, encoding = self.get_page_stream(page)
+            # Read the whole body before downloading thumbnails, so the page's
+            # connection is not held open across thousands of image requests.
+            # Body reads happen as rows are parsed, so they are counted as parse
+            assets = list(staged('parse', self.parse_stream(chunks, encoding)))
+        else:
+            html_content = self.get_page(page)
+            with stage('parse'):
+                assets = self.parse_page(html_content)
+        return self._with_thumbnails(assets)
+
+    def _with_thumbnails(self, assets):
+        """Yield assets after downloading their thumbnails"""
+        for asset in assets:
+            if 'thumbnail_url' in asset:
+                thumbnail_path = self.download_thumbnail(
+                    asset['thumbnail_url'],
+                    asset['asset_id']
+                )
+                asset['local_thumbnail_path'] = thumbnail_path
+            yield asset
+
+    def replay(self, archive_dir, workers=None):
+        """Re-parse a recorded archive on all cores, without network access
+
+        Thumbnails are not downloaded; paths already in the thumbnail store
+        are filled in.
+        """
+        archive = ResponseArchive(archive_dir)
+        assets = RecordBuffer()
+        for entry, page_assets in archive.replay(AdobeStockScraper.parse_page, workers):
+            for asset in page_assets:
+                if 'thumbnail_url' in asset:
+                    asset['local_thumbnail_path'] = self.thumbnail_store.get_path(asset['asset_id'])
+                assets.append(asset)
+        print(f"Replayed {len(assets)} records from {archive_dir}")
+        return assets
+
+    @stage('thumbnail')
+    def process_thumbnails(self, assets, contact_sheets=False, workers=None):
+        """Render fixed-size thumbnail variants on a process pool and record their paths on assets"""
+        processor = ThumbnailProcessor(self.thumbnail_store, workers=workers)
+        processor.process()
+        processor.annotate(assets)
+        if contact_sheets:
+            processor.contact_sheets(assets, os.path.join(self.output_dir, 'contact_sheets'))
+        return assets
+
+    def _store_page(self, all_assets, start):
+        """Upsert the rows added since start into the result store, if one is set"""
+        if self.result_store is not None:
+            self.result_store.upsert(all_assets[i] for i in range(start, len(all_assets)))
+
+    @stage('export')
+    def save_to_store(self, assets, filename='adobe_stock_inventory.sqlite3'):
+        """Upsert the asset data into the SQLite result store"""
+        store = self.result_store or ResultStore(os.path.join(self.output_dir, filename))
+        written = store.upsert(assets)
+        print(f"Upserted {written} records into {store.path}")
+        return store.path
+
+    @stage('export')
+    def save_to_excel(self, assets):
+        """Save the asset data to an Excel file"""
+        if not assets:
+            print("No assets to save")
+            return None
+            
+        filename = os.path.join(
+            self.output_dir,
+            f"adobe_stock_inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        )
+            
+        if isinstance(assets, RecordBuffer):
+            df = assets.to_dataframe()
+        else:
+            df = pd.DataFrame(assets)
+        
+        # Reorder columns for better readability
+        columns = ['date', 'asset_id', 'media_type', 'author', 'license', 'price', 
+                  'thumbnail_url', 'local_thumbnail_path']
+        columns += [variant_field(name) for name in DEFAULT_VARIANTS]
+        df = df.reindex(columns=[col for col in columns if col in df.columns])
+        
+        # Create Excel writer with xlsxwriter engine
+        with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False, sheet_name='Asset Inventory')
+            
+            # Auto-adjust column widths
+            worksheet = writer.sheets['Asset Inventory']
+            for i, col in enumerate(df.columns):
+                max_length = max(df[col].astype(str).apply(len).max(), len(col)) + 2
+                worksheet.set_column(i, i, max_length)
+        
+        print(f"Saved {len(assets)} records to {filename}")
+        return filename
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Adobe Stock license history")
+    parser.add_argument('--stream', action='store_true',
+                        help="parse pages incrementally instead of loading them whole")
+    parser.add_argument('--record', metavar='DIR',
+                        help="archive every fetched page into DIR")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="re-extract from an archive in DIR instead of the network")
+    parser.add_argument('--workers', type=int,
+                        help="processes used by --replay and thumbnail processing")
+    parser.add_argument('--contact-sheets', action='store_true',
+                        help="also write per-media-type contact sheets of the thumbnails")
+    parser.add_argument('--profile', action='store_true',
+                        help="sample the run and write a flamegraph profile to the output directory")
+    args = parser.parse_args()
+
+    scraper = AdobeStockScraper()
+    with SamplingProfiler(scraper.output_dir, 'scraper') if args.profile else nullcontext():
+        try:
+            if args.replay:
+                assets = scraper.replay(args.replay, args.workers)
+            else:
+                if args.record:
+                    scraper.archive = ResponseArchive(args.record)
+                assets = scraper.scrape_all_pages(stream=args.stream)
+            if assets:
+                scraper.process_thumbnails(assets, args.contact_sheets, args.workers)
+                scraper.save_to_excel(assets)
+        except Exception as e:
+            print(f"Scraping failed: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,22 @@
-from scraper.base import AdobeStockScraper
+import argparse
+from contextlib import nullcontext
+from license_history import AdobeStockScraper
+from scraper.profiling import SamplingProfiler
 
 def main():
-    scraper = AdobeStockScraper()
-    try:
-        assets = scraper.scrape_all_pages()
-        if assets:
-            scraper.save_to_excel(assets)
-    except Exception as e:
-        print(f"Scraping failed: {e}")
+    parser = argparse.ArgumentParser(description="Scrape Adobe Stock license history")
+    parser.add_argument('--profile', action='store_true',
+                        help="sample the run and write a flamegraph profile to /data/output")
+    args = parser.parse_args()
+
+    with SamplingProfiler('/data/output', 'main') if args.profile else nullcontext():
+        scraper = AdobeStockScraper()
+        try:
+            assets = scraper.scrape_all_pages()
+            if assets:
+                scraper.save_to_excel(assets)
+        except Exception as e:
+            print(f"Scraping failed: {e}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
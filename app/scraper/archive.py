@@ -0,0 +1,177 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import json
+import os
+import threading
+import zlib
+from .records import RecordBuffer
+
+# Response headers never written to the index; they carry session tokens
+_PRIVATE_HEADERS = {'set-cookie', 'set-cookie2'}
+
+
+class ResponseArchive:
+    """Append-only archive of raw page responses.
+
+    Bodies are written as independent gzip members into numbered segment
+    files; ``index.jsonl`` records the URL, page, status, headers and the
+    (segment, offset, length) of every member. Any record can therefore be
+    read with one seek, and a whole archive can be re-extracted offline in
+    parallel.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._segment = self._last_segment()
+
+    def record(self, url: str, body: bytes, status: int = 200,
+               headers: Optional[Dict] = None, encoding: Optional[str] = None, **meta) -> Dict:
+        """Compress and append one response body"""
+        return self._append(gzip.compress(body), len(body), url, status, headers, encoding, meta)
+
+    def record_response(self, response, **meta) -> Dict:
+        """Archive a fully read requests.Response"""
+        return self.record(
+            response.url, response.content, response.status_code,
+            dict(response.headers), response.encoding, **meta
+        )
+
+    def tee(self, chunks: Iterable[bytes], url: str, status: int = 200,
+            headers: Optional[Dict] = None, encoding: Optional[str] = None,
+            **meta) -> Iterator[bytes]:
+        """Pass streamed chunks through, archiving the body once the stream ends.
+
+        Only the compressed body is buffered, so streaming parsers keep most
+        of their memory advantage while recording.
+        """
+        compressor = zlib.compressobj(wbits=31)  # gzip container
+        compressed = []
+        size = 0
+        for chunk in chunks:
+            compressed.append(compressor.compress(chunk))
+            size += len(chunk)
+            yield chunk
+        compressed.append(compressor.flush())
+        self._append(b''.join(compressed), size, url, status, headers, encoding, meta)
+
+    def entries(self) -> List[Dict]:
+        """All index entries, in recording order"""
+        try:
+            with open(self.index_path, 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def read(self, entry: Dict) -> bytes:
+        """Raw body bytes of an index entry"""
+        return _read_body(self.directory, entry)
+
+    def read_text(self, entry: Dict) -> str:
+        return _decode(entry, self.read(entry))
+
+    def replay(self, extract: Callable[[str], List[Dict]], workers: Optional[int] = None,
+               entries: Optional[List[Dict]] = None) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """Run extract(html) over archived pages on a process pool.
+
+        Only the latest successful response per (url, page) is used, so
+        pages recorded more than once (a re-fetch, or a second run into
+        the same directory) are extracted once. extract must be picklable
+        (a module-level function or a partial of one). Results are yielded
+        in archive order.
+        """
+        entries = self.entries() if entries is None else entries
+        entries = _latest([entry for entry in entries if entry['status'] == 200])
+        if not entries:
+            return
+        chunksize = max(1, len(entries) // ((workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                _replay_entry,
+                [(self.directory, entry, extract) for entry in entries],
+                chunksize=chunksize
+            )
+            yield from zip(entries, results)
+
+    def replay_records(self, extract: Callable[[str], List[Dict]],
+                       workers: Optional[int] = None) -> RecordBuffer:
+        """Re-extract every archived page into a RecordBuffer"""
+        records = RecordBuffer()
+        for _, page_records in self.replay(extract, workers):
+            records.extend(page_records)
+        return records
+
+    def _append(self, compressed: bytes, size: int, url: str, status: int,
+                headers: Optional[Dict], encoding: Optional[str], meta: Dict) -> Dict:
+        with self._lock:
+            path = os.path.join(self.directory, self._segment)
+            if os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+                self._segment = self._segment_name(self._segment_number(self._segment) + 1)
+                path = os.path.join(self.directory, self._segment)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            entry = {
+                'url': url,
+                'status': status,
+                'headers': {
+                    name: value for name, value in (headers or {}).items()
+                    if name.lower() not in _PRIVATE_HEADERS
+                },
+                'encoding': encoding,
+                'fetched_at': datetime.now().isoformat(),
+                'segment': self._segment,
+                'offset': offset,
+                'length': len(compressed),
+                'size': size,
+                **meta
+            }
+            # The index line is written last, so a crash never indexes a partial body
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def _last_segment(self) -> str:
+        numbers = [
+            self._segment_number(name) for name in os.listdir(self.directory)
+            if name.startswith('segment-') and name.endswith('.gz')
+        ]
+        return self._segment_name(max(numbers, default=0))
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"segment-{number:05d}.gz"
+
+    @staticmethod
+    def _segment_number(name: str) -> int:
+        return int(name[len('segment-'):-len('.gz')])
+
+
+def _latest(entries: List[Dict]) -> List[Dict]:
+    """Last entry per (url, page), in the order those entries were recorded"""
+    latest: Dict[Tuple, Dict] = {}
+    for entry in entries:
+        key = (entry['url'], entry.get('page'))
+        latest.pop(key, None)
+        latest[key] = entry
+    return list(latest.values())
+
+
+def _read_body(directory: str, entry: Dict) -> bytes:
+    with open(os.path.join(directory, entry['segment']), 'rb') as f:
+        f.seek(entry['offset'])
+        return gzip.decompress(f.read(entry['length']))
+
+
+def _decode(entry: Dict, body: bytes) -> str:
+    return body.decode(entry.get('encoding') or 'utf-8', errors='replace')
+
+
+def _replay_entry(args) -> List[Dict]:
+    directory, entry, extract = args
+    return list(extract(_decode(entry, _read_body(directory, entry))))
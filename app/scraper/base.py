@@ -1,19 +1,40 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
+from functools import partial
+import asyncio
 import requests
 from bs4 import BeautifulSoup
 import json
 import os
+import textwrap
 from datetime import datetime
 from abc import ABC, abstractmethod
-import time
+from .archive import ResponseArchive
+from .pagination import PageRun, Pagination, discover_pagination
+from .profiling import stage
+from .records import RecordBuffer
+from .result_store import ResultStore
+from .throttle import AdaptiveThrottle, fetch_with_backoff
 
 class UniversalScraper(ABC):
+    cookies_path = 'config/cookies.json'
+
     def __init__(self, ai_assistant, config_path: Optional[str] = None):
         self.session = requests.Session()
         self.ai_assistant = ai_assistant
         self.config = self._load_config(config_path) if config_path else {}
         self.output_dir = "/data/output"
         self.downloads_dir = "/data/downloads"
+        self.throttle = AdaptiveThrottle.from_config(
+            self.config.get('required_elements', {}).get('rate_limits', {})
+        )
+        self.max_consecutive_failures = 3
+        self.failed_pages: List[int] = []
+        # Optional ResultStore; when set, each validated page is upserted as it is scraped
+        self.result_store: Optional[ResultStore] = None
+        # Optional ResponseArchive; when set, every fetched page body is recorded
+        self.archive: Optional[ResponseArchive] = None
+        # Pagination model read from the first page of the current scrape
+        self.pagination: Optional[Pagination] = None
 
     def initialize_scraping(self, url: str, target_data: str) -> bool:
         """Initialize scraping process with AI guidance"""
@@ -64,46 +85,116 @@ class UniversalScraper(ABC):
         cookies = self._collect_cookies()
         self._save_cookies(cookies)
 
-    def scrape_data(self, url: str, target_data: str) -> List[Dict]:
+    def scrape_data(self, url: str, target_data: str) -> RecordBuffer:
         """Main scraping method with AI assistance"""
+        all_data = RecordBuffer()
         if not self.initialize_scraping(url, target_data):
-            return []
+            return all_data
 
-        all_data = []
-        page = 1
+        asyncio.run(self._scrape_pages(url, target_data, all_data))
+        return all_data
+
+    async def _scrape_pages(self, url: str, target_data: str, all_data: RecordBuffer):
+        """Page loop; the next page is fetched while the current one is validated"""
+        run = PageRun(max_consecutive_failures=self.max_consecutive_failures)
+        self.failed_pages = run.failed_pages
+        self.pagination = None
+        prefetched = {}
         
-        while True:
+        while (page := run.next_page()) is not None:
+            fetch = prefetched.pop(page, None) or asyncio.create_task(
+                asyncio.to_thread(self._fetch_page, url, page)
+            )
             try:
-                print(f"Scraping page {page}...")
-                html_content = self._fetch_page(url, page)
+                if not run.retrying:
+                    print(f"Scraping page {page}...")
+                html_content = await fetch
                 
                 # Use AI to analyze page structure
-                structure = self.ai_assistant.analyze_page_structure(html_content)
-                
-                # Generate or update selectors if needed
-                selectors = self.ai_assistant.generate_selectors(target_data, structure)
+                with stage('ai'):
+                    structure = await self.ai_assistant.analyze_page_structure_async(html_content)
+                    
+                    # Generate or update selectors if needed
+                    selectors = await self.ai_assistant.generate_selectors_async(target_data, structure)
                 
                 # Extract data using selectors
-                page_data = self._extract_data(html_content, selectors)
-                
-                # Validate extracted data
-                is_valid, message = self.ai_assistant.validate_data(page_data)
-                if not is_valid:
-                    print(f"Data validation failed: {message}")
-                    break
-                
-                all_data.extend(page_data)
-                
-                if not self._has_next_page(html_content):
-                    break
-                    
-                page += 1
+                with stage('parse'):
+                    page_data = self._extract_data(html_content, selectors)
                 
             except Exception as e:
-                print(f"Error on page {page}: {e}")
-                break
+                run.failed(page, e)
+                continue
 
-        return all_data
+            if self.pagination is None:
+                self.pagination = discover_pagination(html_content, url, len(page_data))
+                self.pagination.observe(page, html_content, url)
+            # With a known page count the remaining pages are fetched concurrently instead
+            parallel = (page == 1 and self.pagination.random_access
+                        and self.pagination.total_pages > 1)
+            has_next = self._has_next_page(html_content) and self.pagination.has_page(page + 1)
+            if has_next and not parallel and not run.retrying:
+                prefetched[page + 1] = asyncio.create_task(
+                    asyncio.to_thread(self._fetch_page, url, page + 1)
+                )
+            
+            if not await self._accept_page(page, page_data, all_data, run):
+                continue
+            run.succeeded(page, has_next or parallel)
+            
+            if parallel:
+                last = self.pagination.total_pages
+                await self._scrape_known_pages(url, target_data, all_data, range(2, last + 1), run)
+                # A count read off windowed page links is only a lower bound
+                if self.pagination.exact:
+                    run.stop()
+                run.skip_to(last + 1)
+
+        for fetch in prefetched.values():
+            fetch.cancel()
+
+    async def _scrape_page(self, url: str, target_data: str, page: int) -> List[Dict]:
+        """Fetch a page and extract its rows with AI-generated selectors"""
+        html_content = await asyncio.to_thread(self._fetch_page, url, page)
+        with stage('ai'):
+            structure = await self.ai_assistant.analyze_page_structure_async(html_content)
+            selectors = await self.ai_assistant.generate_selectors_async(target_data, structure)
+        with stage('parse'):
+            return self._extract_data(html_content, selectors)
+
+    async def _accept_page(self, page: int, page_data: List[Dict], all_data: RecordBuffer,
+                           run: PageRun) -> bool:
+        """Validate a page's rows; valid ones are added to all_data and the result store"""
+        with stage('ai'):
+            is_valid, message = await self.ai_assistant.validate_data_async(page_data)
+        if not is_valid:
+            run.invalid(page, message)
+            return False
+        all_data.extend(page_data)
+        if self.result_store is not None:
+            self.result_store.upsert(page_data)
+        return True
+
+    async def _scrape_known_pages(self, url: str, target_data: str, all_data: RecordBuffer,
+                                  pages: Iterable[int], run: PageRun):
+        """Scrape pages concurrently and in any order; the throttle paces the requests.
+
+        As in the sequential loop, a page that fails validation stops the
+        run, and pages not started yet are skipped.
+        """
+        limit = asyncio.Semaphore(self.throttle.max_concurrency)
+
+        async def scrape(page: int):
+            async with limit:
+                if not run.walking:
+                    return
+                try:
+                    page_data = await self._scrape_page(url, target_data, page)
+                except Exception as e:
+                    run.failed_concurrently(page, e)
+                    return
+                await self._accept_page(page, page_data, all_data, run)
+
+        await asyncio.gather(*(scrape(page) for page in pages))
 
     @abstractmethod
     def _extract_data(self, html_content: str, selectors: List[str]) -> List[Dict]:
@@ -141,34 +232,70 @@ class UniversalScraper(ABC):
 
     def _save_cookies(self, cookies: Dict):
         """Save cookies to configuration"""
-        with open('config/cookies.json', 'w') as f:
+        with open(self.cookies_path, 'w') as f:
             json.dump(cookies, f, indent=2)
 
-    def export_data(self, data: List[Dict], format: str = 'excel'):
+    def load_cookies(self) -> bool:
+        """Load cookies saved by _save_cookies into the session"""
+        try:
+            with open(self.cookies_path, 'r') as f:
+                self.session.cookies.update(json.load(f))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @stage('export')
+    def export_data(self, data: Iterable[Dict], format: str = 'excel'):
         """Export scraped data in specified format"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         if format == 'excel':
             self._export_to_excel(data, f"scraping_results_{timestamp}.xlsx")
         elif format == 'json':
             self._export_to_json(data, f"scraping_results_{timestamp}.json")
+        elif format == 'sqlite':
+            self._export_to_store(data, 'scraping_results.sqlite3')
         else:
             raise ValueError(f"Unsupported export format: {format}")
 
-    def _export_to_excel(self, data: List[Dict], filename: str):
+    def _export_to_excel(self, data: Iterable[Dict], filename: str):
         """Export data to Excel"""
         import pandas as pd
-        df = pd.DataFrame(data)
+        if isinstance(data, RecordBuffer):
+            df = data.to_dataframe()
+        else:
+            df = pd.DataFrame(data)
         filepath = os.path.join(self.output_dir, filename)
         df.to_excel(filepath, index=False)
         print(f"Data exported to {filepath}")
 
-    def _export_to_json(self, data: List[Dict], filename: str):
+    def _export_to_json(self, data: Iterable[Dict], filename: str):
         """Export data to JSON"""
         filepath = os.path.join(self.output_dir, filename)
         with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+            # Write record by record so large buffers are never materialized as a list
+            separator = '\n'
+            f.write('[')
+            for record in data:
+                f.write(separator)
+                f.write(textwrap.indent(json.dumps(record, indent=2), '  '))
+                separator = ',\n'
+            f.write(']' if separator == '\n' else '\n]')
         print(f"Data exported to {filepath}")
 
+    def _export_to_store(self, data: Iterable[Dict], filename: str, batch_size: int = 1000):
+        """Upsert data into the SQLite result store, one transaction per batch"""
+        filepath = os.path.join(self.output_dir, filename)
+        store = self.result_store if self.result_store is not None else ResultStore(filepath)
+        batch = []
+        written = 0
+        for record in data:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                written += store.upsert(batch)
+                batch = []
+        written += store.upsert(batch)
+        print(f"Upserted {written} records into {store.path}")
+
     def _get_site_config(self, url: str) -> Optional[Dict]:
         """Get site-specific configuration if it exists"""
         filename = f"site_configs/{url.replace('://', '_').replace('/', '_')}.json"
@@ -178,15 +305,30 @@ class UniversalScraper(ABC):
         except FileNotFoundError:
             return None
 
+    @stage('fetch')
     def _fetch_page(self, url: str, page: int, max_retries: int = 3) -> str:
-        """Fetch page content with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                response = self.session.get(url, params={'page': page})
-                response.raise_for_status()
-                return response.text
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"Failed to fetch page {page} after {max_retries} attempts: {e}")
-                print(f"Attempt {attempt + 1} failed, retrying...")
-                time.sleep(2 ** attempt)  # Exponential backoff 
\ No newline at end of file
+        """Fetch page content through the adaptive throttle with retry logic"""
+        response = fetch_with_backoff(
+            self.session, url, self.throttle, max_retries, params=self._page_params(page)
+        )
+        if self.archive is not None:
+            self.archive.record_response(response, page=page)
+        if self.pagination is not None:
+            self.pagination.observe(page, response.text, response.url)
+        return response.text
+
+    def _page_params(self, page: int) -> Dict:
+        if self.pagination is None:
+            return {'page': page}
+        return self.pagination.params(page)
+
+    def replay(self, archive_dir: str, selectors: List[str], workers: Optional[int] = None) -> RecordBuffer:
+        """Re-extract data from a recorded archive, in parallel and without network access"""
+        archive = ResponseArchive(archive_dir)
+        return archive.replay_records(partial(_extract_archived, type(self), selectors), workers)
+
+
+def _extract_archived(scraper_cls, selectors: List[str], html_content: str) -> List[Dict]:
+    """Process-pool entry point for replay; _extract_data must not rely on instance state"""
+    scraper = scraper_cls.__new__(scraper_cls)
+    return scraper._extract_data(html_content, selectors)
@@ -0,0 +1,59 @@
+from functools import partial
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup
+from .archive import ResponseArchive
+from .base import UniversalScraper
+from .records import RecordBuffer
+
+
+class ConfiguredScraper(UniversalScraper):
+    """Scraper driven by a site config's selectors and data_mapping.
+
+    data_mapping maps each output field to the index of its cell in a row,
+    e.g. {"date": 0, "asset_id": 2}; rows with too few cells are skipped.
+    selectors.next_page, if set, marks the next-page link.
+    """
+
+    def __init__(self, ai_assistant, config_path: Optional[str] = None):
+        super().__init__(ai_assistant, config_path)
+        self.data_mapping: Dict[str, int] = self.config.get('data_mapping', {})
+        self.next_page_selector = self.config.get('selectors', {}).get('next_page', 'a.next-page')
+
+    def _extract_data(self, html_content: str, selectors: List[str]) -> List[Dict]:
+        return extract_mapped_rows(selectors, self.data_mapping, html_content)
+
+    def _has_next_page(self, html_content: str) -> bool:
+        soup = BeautifulSoup(html_content, 'lxml')
+        return soup.select_one(self.next_page_selector) is not None
+
+    def replay(self, archive_dir: str, selectors: List[str], workers: Optional[int] = None) -> RecordBuffer:
+        # The mapping is instance state, so it is bound here rather than read in the worker
+        archive = ResponseArchive(archive_dir)
+        return archive.replay_records(partial(extract_mapped_rows, selectors, self.data_mapping), workers)
+
+
+def extract_mapped_rows(selectors: List[str], data_mapping: Dict[str, int], html_content: str) -> List[Dict]:
+    """Name the cells (selectors[1]) of each row (selectors[0]) by data_mapping.
+
+    Module-level, with html_content last, so replay can bind the rest with
+    functools.partial and ship it to worker processes.
+    """
+    if not data_mapping:
+        return []
+    soup = BeautifulSoup(html_content, 'lxml')
+    cells_needed = max(data_mapping.values()) + 1
+    rows = []
+
+    for row in soup.select(selectors[0]):
+        columns = row.select(selectors[1])
+        if len(columns) < cells_needed:
+            continue
+        record = {field: columns[index].text.strip() for field, index in data_mapping.items()}
+
+        img = row.select_one(selectors[2]) if len(selectors) > 2 else None
+        if img and img.get('src'):
+            record['thumbnail_url'] = img['src']
+
+        rows.append(record)
+
+    return rows
@@ -0,0 +1,390 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlparse
+import math
+import re
+from bs4 import BeautifulSoup
+from .throttle import is_client_error
+
+# Query parameters by the scheme they imply, most common first
+PAGE_PARAMS = ['page', 'p', 'pg', 'pagenum', 'page_number', 'pageNumber', 'paged']
+OFFSET_PARAMS = ['offset', 'start', 'skip', 'from']
+CURSOR_PARAMS = ['cursor', 'after', 'page_token', 'pageToken', 'next_token', 'continuation']
+
+_CONTAINER = re.compile(r'pagination|pager|paging|page-nav|pagenav', re.IGNORECASE)
+_PAGE_OF = re.compile(r'\bpage\s+\d+\s+(?:of|/)\s+([\d,]+)', re.IGNORECASE)
+_NEXT = re.compile(r'\bnext\b|^\s*(?:›|»|→|>)\s*$', re.IGNORECASE)
+_PREVIOUS = re.compile(r'\bprev(?:ious)?\b|^\s*(?:‹|«|←|<)\s*$', re.IGNORECASE)
+_LAST = re.compile(r'\blast\b|»»|≫|⇥', re.IGNORECASE)
+_RESULT_COUNT = re.compile(
+    r'(?:(\d[\d,]*)\s*(?:-|–|to)\s*(\d[\d,]*)\s+of\s+)?(\d[\d,]*)\s+'
+    r'(?:results?|items?|records?|entries|rows|licen[sc]es|assets|matches)',
+    re.IGNORECASE
+)
+
+
+class Pagination:
+    """How a listing is paged, as discovered from its first page.
+
+    page and offset schemes with a known total are random access: every
+    page's query parameters are known up front (see pages()/params()), so
+    pages can be fetched in parallel and in any order. Cursor schemes, and
+    anything without a total, can only be walked one page at a time. When
+    exact is False the total is a lower bound read off windowed page links,
+    and pages after it still have to be discovered sequentially.
+    """
+
+    def __init__(self, scheme: str = 'page', param: str = 'page', first: int = 1,
+                 per_page: Optional[int] = None, total_pages: Optional[int] = None,
+                 total_rows: Optional[int] = None, exact: bool = False):
+        self.scheme = scheme
+        self.param = param
+        self.first = first
+        self.per_page = per_page
+        self.total_pages = total_pages
+        self.total_rows = total_rows
+        self.exact = exact
+        # Page number -> query parameters, learned from next links (cursor scheme only)
+        self.cursors: Dict[int, Dict] = {}
+
+    @property
+    def random_access(self) -> bool:
+        if self.scheme == 'offset' and not self.per_page:
+            return False
+        return self.scheme in ('page', 'offset') and self.total_pages is not None
+
+    def pages(self) -> List[int]:
+        """Every page number (1-based), when the total is known"""
+        if self.total_pages is None:
+            raise ValueError(f"Total page count unknown for {self.scheme} pagination")
+        return list(range(1, self.total_pages + 1))
+
+    def has_page(self, page: int) -> bool:
+        """Whether a page can exist and can be requested yet"""
+        if self.scheme == 'cursor':
+            return page == 1 or page in self.cursors
+        return not self.exact or self.total_pages is None or page <= self.total_pages
+
+    def params(self, page: int) -> Dict:
+        """Query parameters that request a 1-based page number"""
+        if self.scheme == 'offset':
+            return {self.param: self.first + (page - 1) * (self.per_page or 0)}
+        if self.scheme == 'cursor':
+            if page == 1:
+                return {}
+            if page not in self.cursors:
+                raise ValueError(f"No cursor known for page {page}; fetch page {page - 1} first")
+            return self.cursors[page]
+        return {self.param: self.first + page - 1}
+
+    def observe(self, page: int, html_content, url: str = ''):
+        """Learn the cursor of the following page from a page's next link"""
+        if self.scheme != 'cursor':
+            return
+        value = _next_link_value(html_content, url, self.param)
+        if value is not None:
+            self.cursors[page + 1] = {self.param: value}
+
+    def to_dict(self) -> Dict:
+        return {
+            'scheme': self.scheme,
+            'param': self.param,
+            'first': self.first,
+            'per_page': self.per_page,
+            'total_pages': self.total_pages,
+            'total_rows': self.total_rows,
+            'exact': self.exact,
+        }
+
+
+def discover_pagination(html_content, url: str = '', per_page: Optional[int] = None) -> Pagination:
+    """Read the paging scheme and total from a listing's first page.
+
+    html_content may also be an already parsed BeautifulSoup document, or
+    just the parts of the page around the rows (see streaming.ChunkEdges).
+    The total comes from a "Page 1 of N" label, a result-count label such as
+    "Showing 1-50 of 1,234 results", a "last page" link or, failing those,
+    the largest page linked from the pagination controls; only the last of
+    these can undercount (see Pagination.exact). A bare count ("1,234
+    results") is only read in or next to the pagination controls, since
+    pages carry unrelated ones ("Cart (0 items)"), and a label total below
+    the largest linked page is ignored. Without pagination controls, links
+    that read like page links ("2", "Next") still give the scheme, but only
+    a label gives a total. per_page, e.g. the number of rows extracted from
+    this page, turns a row count into a page count.
+    """
+    soup = _soup(html_content)
+    containers = soup.find_all(is_pagination_container)
+    links = [a for container in containers for a in container.find_all('a', href=True)]
+    # Any other link can carry a page-like parameter (?p=48213 for a blog post)
+    controls = bool(links)
+    if not controls:
+        links = [a for a in soup.find_all('a', href=True) if _reads_as_page_link(a)]
+
+    queries = [(link, parse_qs(urlparse(urljoin(url, link['href'])).query)) for link in links]
+    values: Dict[str, List[str]] = {}
+    for _, query in queries:
+        for param, found in query.items():
+            values.setdefault(param, []).extend(found)
+    current = parse_qs(urlparse(url).query)
+
+    # Count labels often sit outside the controls ("Showing 1-50 of 1,234 results" above the table)
+    near = ' '.join(_text_near(container) for container in containers)
+    text = near + ' ' + soup.get_text(' ')
+    total_rows, label_per_page = _result_count(near, text)
+    rows_on_page = per_page
+    per_page = label_per_page or per_page
+    known_pages = _page_of(text)
+    if known_pages is None and total_rows is not None and per_page:
+        known_pages = max(1, math.ceil(total_rows / per_page))
+
+    param = _first_param(PAGE_PARAMS, values, numeric=True)
+    if param:
+        numbers = _numbers(values[param]) + _numbers(current.get(param, []))
+        first = 0 if 0 in numbers else 1
+        if not controls:
+            return Pagination('page', param, first, per_page, total_pages=known_pages,
+                              total_rows=total_rows, exact=known_pages is not None)
+        last = _last_link_value(queries, param)
+        if known_pages is None and last is not None:
+            known_pages = last - first + 1
+        # Numbered buttons can be windowed ("1 2 3 4 5 Next"), so this is only a lower bound
+        linked_pages = max([max(numbers) - first + 1] + _numbers(
+            [link.get_text(strip=True) for link, query in queries if param in query]
+        ))
+        if known_pages is not None and known_pages < linked_pages:
+            known_pages = None
+        return Pagination('page', param, first, per_page, total_pages=known_pages or linked_pages,
+                          total_rows=total_rows, exact=known_pages is not None)
+
+    param = _first_param(OFFSET_PARAMS, values, numeric=True)
+    if param:
+        offsets = sorted(set(_numbers(values[param]) + _numbers(current.get(param, []))))
+        step = label_per_page or (_offset_step(offsets) if controls else None) or rows_on_page
+        if step:
+            # Offsets count from 0 or, on some sites, from 1 (start=1, 51, 101, ...)
+            first = 1 if offsets and offsets[0] % step == 1 else 0
+            if not controls:
+                return Pagination('offset', param, first, step, total_pages=known_pages,
+                                  total_rows=total_rows, exact=known_pages is not None)
+            last = _last_link_value(queries, param)
+            if known_pages is None and last is not None:
+                known_pages = (last - first) // step + 1
+            linked_pages = (offsets[-1] - first) // step + 1
+            if known_pages is not None and known_pages < linked_pages:
+                known_pages = None
+            return Pagination('offset', param, first, step, total_pages=known_pages or linked_pages,
+                              total_rows=total_rows, exact=known_pages is not None)
+
+    param = _first_param(CURSOR_PARAMS, values, numeric=False)
+    if param:
+        return Pagination('cursor', param, per_page=per_page, total_rows=total_rows)
+
+    # No recognizable links; a label alone still gives the total for the default ?page= scheme
+    return Pagination('page', 'page', 1, per_page, total_pages=known_pages,
+                      total_rows=total_rows, exact=known_pages is not None)
+
+
+class PageRun:
+    """Which page a scrape loop fetches next, and what a failed page does to the run.
+
+    Pages are walked in order from first until one has no next page, a 4xx
+    response ends the listing (e.g. a 404 for the page after the last one)
+    or max_consecutive_failures pages in a row fail. Failed and invalid
+    pages are skipped and, once the walk is over, next_page() hands each
+    out once more; failed_pages holds the ones still missing.
+    """
+
+    def __init__(self, first: int = 1, max_consecutive_failures: int = 3, label: str = ''):
+        self.failed_pages: List[int] = []
+        self.max_consecutive_failures = max_consecutive_failures
+        self.label = label  # e.g. " of <url>", appended to page numbers in messages
+        self.retrying = False
+        self._page = first
+        self._walking = True
+        self._consecutive_failures = 0
+        self._retries: List[int] = []
+
+    def next_page(self) -> Optional[int]:
+        """The page to scrape next, or None when the run is over"""
+        if self._walking:
+            return self._page
+        if not self.retrying:
+            self.retrying = True
+            self._retries = list(self.failed_pages)
+        if not self._retries:
+            return None
+        page = self._retries.pop(0)
+        print(f"Retrying page {page}{self.label}...")
+        return page
+
+    def succeeded(self, page: int, has_next: bool = True):
+        if self.retrying:
+            self.failed_pages.remove(page)
+            return
+        self._consecutive_failures = 0
+        if has_next:
+            self._page = page + 1
+        else:
+            self.stop()
+
+    def failed(self, page: int, error: Exception):
+        """A page could not be fetched or parsed"""
+        if self.retrying:
+            print(f"Page {page}{self.label} failed again: {error}")
+            return
+        if is_client_error(error):
+            print(f"Page {page}{self.label} returned {error.response.status_code}; "
+                  f"treating it as the end of the listing")
+            self.stop()
+            return
+        print(f"Error on page {page}{self.label}: {error}")
+        self.failed_pages.append(page)
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.max_consecutive_failures:
+            print(f"Stopping after {self._consecutive_failures} consecutive failed pages")
+            self.stop()
+        else:
+            self._page = page + 1
+
+    def failed_concurrently(self, page: int, error: Exception):
+        """A page fetched concurrently failed; it is retried without ending the walk"""
+        print(f"Error on page {page}{self.label}: {error}")
+        self.failed_pages.append(page)
+        self.failed_pages.sort()
+
+    def invalid(self, page: int, message: str):
+        """A page's rows failed validation; as the data can't be trusted, the walk ends"""
+        print(f"Data validation failed on page {page}{self.label}: {message}")
+        if page not in self.failed_pages:
+            self.failed_pages.append(page)
+            self.failed_pages.sort()
+        self.stop()
+
+    def skip_to(self, page: int):
+        """Continue the walk at page, e.g. after the pages before it were fetched concurrently"""
+        if self._walking:
+            self._page = page
+
+    def stop(self):
+        """End the walk; failed pages are still retried"""
+        self._walking = False
+
+    @property
+    def walking(self) -> bool:
+        return self._walking
+
+
+def fetch_pages(fetch: Callable[[int], object], pages: Iterable[int],
+                max_workers: int) -> Iterator[Tuple[int, object, Optional[Exception]]]:
+    """Fetch pages concurrently, yielding (page, result, error) as each completes.
+
+    Rate and concurrency limits are left to fetch (e.g. fetch_with_backoff
+    and its throttle); max_workers only caps the threads waiting on it.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(fetch, page): page for page in pages}
+        for future in as_completed(futures):
+            page = futures.pop(future)
+            try:
+                yield page, future.result(), None
+            except Exception as e:
+                yield page, None, e
+
+
+def is_pagination_container(tag) -> bool:
+    """Whether an element's id, class, role or aria-label marks it as pagination controls"""
+    attributes = ' '.join(
+        [tag.get('id') or '', tag.get('aria-label') or '', tag.get('role') or '']
+        + list(tag.get('class') or [])
+    )
+    return bool(_CONTAINER.search(attributes))
+
+
+def _last_link_value(queries: List[Tuple], param: str) -> Optional[int]:
+    """Value of param on a link marked as the last page, if there is one"""
+    for link, query in queries:
+        label = ' '.join(
+            [link.get_text(' ', strip=True), link.get('aria-label') or '', link.get('title') or '']
+            + list(link.get('rel') or []) + list(link.get('class') or [])
+        )
+        if _LAST.search(label):
+            numbers = _numbers(query.get(param, []))
+            if numbers:
+                return numbers[0]
+    return None
+
+
+def _reads_as_page_link(link) -> bool:
+    """Whether a link outside pagination controls reads as one: a page number, next, previous or last"""
+    text = link.get_text(' ', strip=True)
+    label = ' '.join([text, link.get('aria-label') or ''] + list(link.get('rel') or []))
+    return bool(re.fullmatch(r'\d+', text) or _NEXT.search(label)
+                or _PREVIOUS.search(label) or _LAST.search(label))
+
+
+def _offset_step(offsets: List[int]) -> Optional[int]:
+    """Rows per page from the gaps between linked offsets; a 1-row gap is not trusted"""
+    gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+    step = min(gaps) if gaps else None
+    return step if step and step > 1 else None
+
+
+def _soup(html_content) -> BeautifulSoup:
+    if isinstance(html_content, BeautifulSoup):
+        return html_content
+    return BeautifulSoup(html_content, 'lxml')
+
+
+def _next_link_value(html_content, url: str, param: str) -> Optional[str]:
+    soup = _soup(html_content)
+    for link in soup.find_all('a', href=True):
+        rel = ' '.join(link.get('rel') or [])
+        label = ' '.join([link.get_text(' ', strip=True), link.get('aria-label') or ''])
+        if 'next' in rel or _NEXT.search(label):
+            found = parse_qs(urlparse(urljoin(url, link['href'])).query).get(param)
+            if found:
+                return found[0]
+    return None
+
+
+def _first_param(candidates: List[str], values: Dict[str, List[str]], numeric: bool) -> Optional[str]:
+    for param in candidates:
+        found = values.get(param)
+        if found and (not numeric or _numbers(found)):
+            return param
+    return None
+
+
+def _numbers(values: Iterable[str]) -> List[int]:
+    return [int(value.replace(',', '')) for value in values if re.fullmatch(r'\d[\d,]*', value or '')]
+
+
+def _page_of(text: str) -> Optional[int]:
+    match = _PAGE_OF.search(text)
+    return int(match.group(1).replace(',', '')) if match else None
+
+
+def _text_near(container) -> str:
+    """Text of a pagination container and the elements right before and after it"""
+    parts = [container.find_previous_sibling(), container, container.find_next_sibling()]
+    return ' '.join(part.get_text(' ') for part in parts if part is not None)
+
+
+def _result_count(near: str, text: str) -> Tuple[Optional[int], Optional[int]]:
+    """(total rows, rows per page) from a label like "Showing 1-50 of 1,234 results".
+
+    Labels with a row range are read from anywhere in text, bare counts only
+    from near (the text around the pagination controls).
+    """
+    match = next((m for m in _RESULT_COUNT.finditer(text) if m.group(1)), None)
+    match = match or _RESULT_COUNT.search(near)
+    if not match:
+        return None, None
+    total = int(match.group(3).replace(',', ''))
+    per_page = None
+    if match.group(1) and match.group(2):
+        low, high = int(match.group(1).replace(',', '')), int(match.group(2).replace(',', ''))
+        if high >= low:
+            per_page = high - low + 1
+    return total, per_page
@@ -0,0 +1,224 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Pipeline stage of the running code; each thread and asyncio task has its own
+_stage: ContextVar[Optional[str]] = ContextVar('stage', default=None)
+# Thread id -> stage last entered or restored on it, as read by the sampler; only maintained while profiling
+_thread_stages: Dict[int, str] = {}
+_profiling = False
+
+# Untagged threads (e.g. asyncio.to_thread workers) are attributed by the code they run
+_MODULE_STAGES = [
+    ('ai_assistant', 'ai'),
+    ('anthropic', 'ai'),
+    ('openai', 'ai'),
+    ('generativeai', 'ai'),
+]
+
+
+@contextmanager
+def stage(name: str):
+    """Tag samples taken on this thread with a pipeline stage.
+
+    Costs a single check when no profiler is running. The tag is held in a
+    ContextVar, so asyncio tasks that enter and leave stages out of order
+    each restore their own; the sampler sees whichever tag was set or
+    restored last on the thread.
+    """
+    if not _profiling:
+        yield
+        return
+    token = _stage.set(name)
+    _thread_stages[threading.get_ident()] = name
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+        _publish(_stage.get())
+
+
+def _publish(name: Optional[str]):
+    ident = threading.get_ident()
+    if name is None:
+        _thread_stages.pop(ident, None)
+    else:
+        _thread_stages[ident] = name
+
+
+def staged(name: str, iterable: Iterable) -> Iterator:
+    """Iterate under a stage tag, without holding it while the consumer runs"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler for a whole scrape run.
+
+    A background thread samples the stack of every thread at a fixed
+    interval and counts them under the active stage (see stage()). On stop,
+    collapsed stacks are written for flamegraph tools (flamegraph.pl,
+    speedscope, inferno) together with a tracemalloc report of the largest
+    allocation sites.
+    """
+
+    def __init__(self, output_dir: str = '/data/output', name: str = 'scrape',
+                 interval: float = 0.01, trace_memory: bool = True,
+                 snapshot_interval: float = 10.0, top: int = 25):
+        self.output_dir = output_dir
+        self.name = name
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.snapshot_interval = snapshot_interval
+        self.top = top
+
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self._elapsed = 0.0
+        self._peak_snapshot: Optional[Tuple[float, int, tracemalloc.Snapshot]] = None
+        self._final_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        global _profiling
+        if self.trace_memory and not tracemalloc.is_tracing():
+            # The report only reads the innermost frame of each allocation
+            tracemalloc.start(1)
+            self._started_tracemalloc = True
+        self._started_at = time.monotonic()
+        _profiling = True
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> List[str]:
+        """Stop sampling and write the reports; returns the written paths"""
+        global _profiling
+        if self._thread is None:
+            return []
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._elapsed = time.monotonic() - self._started_at
+        _profiling = False
+        _thread_stages.clear()
+
+        if tracemalloc.is_tracing():
+            self._final_snapshot = self._take_snapshot()
+            self._keep_if_peak(self._final_snapshot)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        return self.write_reports()
+
+    def write_reports(self) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(
+            self.output_dir, f"profile_{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+        paths = [f"{prefix}.collapsed", f"{prefix}_report.txt"]
+        with open(paths[0], 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        with open(paths[1], 'w') as f:
+            f.write(self.report())
+        print(f"Profile written to {paths[0]} and {paths[1]}")
+        return paths
+
+    def stage_counts(self) -> Counter:
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[stack[0]] += count
+        return counts
+
+    def report(self) -> str:
+        lines = [
+            f"{self.samples} samples every {self.interval * 1000:g} ms over {self._elapsed:.1f} s",
+            "",
+            "Samples by stage:",
+        ]
+        total = sum(self.stacks.values()) or 1
+        for name, count in self.stage_counts().most_common():
+            lines.append(f"  {name:<12} {count:>8}  {100 * count / total:5.1f}%")
+
+        if self._peak_snapshot is not None:
+            offset, size, snapshot = self._peak_snapshot
+            lines += ["", f"Top allocations at peak ({size / 2**20:.1f} MiB traced, +{offset:.1f} s):"]
+            lines += self._format_statistics(snapshot)
+        if self._final_snapshot is not None:
+            lines += ["", "Top allocations still held at the end of the run:"]
+            lines += self._format_statistics(self._final_snapshot)
+        return '\n'.join(lines) + '\n'
+
+    def _run(self):
+        own = threading.get_ident()
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self._collapse(ident, frame)] += 1
+            self.samples += 1
+            if self.trace_memory and time.monotonic() >= next_snapshot:
+                self._keep_if_peak(self._take_snapshot())
+                next_snapshot = time.monotonic() + self.snapshot_interval
+
+    def _collapse(self, ident: int, frame) -> Tuple[str, ...]:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            filename = '/'.join(code.co_filename.replace(os.sep, '/').rsplit('/', 2)[-2:])
+            labels.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.reverse()
+        return (_thread_stages.get(ident) or _stage_from_stack(labels),) + tuple(labels)
+
+    def _keep_if_peak(self, snapshot: tracemalloc.Snapshot):
+        size = sum(stat.size for stat in snapshot.statistics('filename'))
+        if self._peak_snapshot is None or size > self._peak_snapshot[1]:
+            self._peak_snapshot = (time.monotonic() - self._started_at, size, snapshot)
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def _format_statistics(self, snapshot: tracemalloc.Snapshot) -> List[str]:
+        lines = []
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            where = stat.traceback[0]
+            lines.append(
+                f"  {stat.size / 1024:10.1f} KiB {stat.count:>9} blocks  {where.filename}:{where.lineno}"
+            )
+        return lines
+
+
+def _stage_from_stack(labels: List[str]) -> str:
+    for label in reversed(labels):
+        for fragment, name in _MODULE_STAGES:
+            if fragment in label:
+                return name
+    return 'other'
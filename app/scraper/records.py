@@ -0,0 +1,206 @@
+import sys
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Column order used by the license history scrapers
+ASSET_FIELDS = ['date', 'author', 'asset_id', 'license', 'media_type', 'price',
+                'thumbnail_url', 'local_thumbnail_path']
+
+# Low-cardinality columns that repeat across many rows
+ENCODED_FIELDS = ['date', 'author', 'license', 'media_type', 'price']
+
+_MISSING = object()
+_MISSING_CODE = -1
+_NONE_CODE = -2
+
+
+class RecordBuffer:
+    """Column-oriented storage for scraped rows.
+
+    Repeated values (author, license, media_type, ...) are dictionary-encoded
+    into integer code arrays, so each distinct string is stored once. The
+    buffer still iterates as dicts for code written against lists of records,
+    but those dicts are built on access: changing one does not change the
+    buffer. Use set_column() or map_column() to change values instead.
+    """
+
+    def __init__(self, fields: Optional[Iterable[str]] = None,
+                 encoded_fields: Optional[Iterable[str]] = None):
+        self._fields: List[str] = []
+        self._encoded = set(ENCODED_FIELDS if encoded_fields is None else encoded_fields)
+        self._columns: Dict[str, Any] = {}
+        self._values: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {}
+        self._length = 0
+
+        for field in (ASSET_FIELDS if fields is None else fields):
+            self._add_field(field)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self._length):
+            yield self._record(index)
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record index out of range")
+        return self._record(index)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._fields)
+
+    def append(self, record: Dict):
+        """Append a single record"""
+        for field in record:
+            if field not in self._columns:
+                self._add_field(field)
+
+        for field in self._fields:
+            value = record.get(field, _MISSING)
+            if field in self._encoded:
+                self._columns[field].append(self._encode(field, value))
+            else:
+                self._columns[field].append(value)
+        self._length += 1
+
+    def extend(self, records: Iterable[Dict]):
+        """Append every record from an iterable"""
+        for record in records:
+            self.append(record)
+
+    def truncate(self, length: int):
+        """Drop every record from position length onwards"""
+        if not 0 <= length <= self._length:
+            raise ValueError("truncate length out of range")
+        for field in self._fields:
+            del self._columns[field][length:]
+        self._length = length
+
+    def set_column(self, field: str, values: Iterable[Any]):
+        """Add or replace a whole column; values must line up with the records"""
+        values = list(values)
+        if len(values) != self._length:
+            raise ValueError("column length does not match the number of records")
+        self._add_field(field)
+        if field in self._encoded:
+            self._values[field] = []
+            self._codes[field] = {}
+            self._columns[field] = array('i', (self._encode(field, value) for value in values))
+        else:
+            self._columns[field] = values
+
+    def map_column(self, field: str, func: Callable[[Any], Any]):
+        """Replace each value of a column with func(value), in place.
+
+        Encoded columns call func once per distinct value. Records that never
+        set the field are left without it.
+        """
+        if field not in self._columns:
+            raise KeyError(field)
+        column = self._columns[field]
+        if field not in self._encoded:
+            self._columns[field] = [value if value is _MISSING else func(value) for value in column]
+            return
+
+        values = self._values[field]
+        self._values[field] = []
+        self._codes[field] = {}
+        remap = {code: self._encode(field, func(value)) for code, value in enumerate(values)}
+        remap[_MISSING_CODE] = _MISSING_CODE
+        if _NONE_CODE in column:
+            remap[_NONE_CODE] = self._encode(field, func(None))
+        self._columns[field] = array('i', (remap[code] for code in column))
+
+    def column(self, field: str) -> List[Any]:
+        """Return the decoded values of a column (None where missing)"""
+        if field not in self._columns:
+            raise KeyError(field)
+        if field in self._encoded:
+            values = self._values[field]
+            return [values[code] if code >= 0 else None for code in self._columns[field]]
+        return [None if value is _MISSING else value for value in self._columns[field]]
+
+    def to_dataframe(self):
+        """Build a DataFrame straight from the columns.
+
+        Encoded columns become pandas categoricals that share the code
+        arrays, so no per-row dicts or string copies are created.
+        """
+        import numpy as np
+        import pandas as pd
+
+        # Skip columns no record ever set, as pd.DataFrame(list_of_dicts) would
+        fields = [field for field in self._fields if self._is_set(field)]
+        data = {}
+        for field in fields:
+            if field in self._encoded:
+                codes = np.frombuffer(self._columns[field], dtype=np.int32)
+                # pandas only knows -1 as "missing"; None is exported as missing too
+                codes = np.where(codes < 0, -1, codes)
+                data[field] = pd.Categorical.from_codes(codes, categories=self._values[field])
+            else:
+                data[field] = self.column(field)
+
+        return pd.DataFrame(data, columns=fields)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the buffer and its values"""
+        total = sys.getsizeof(self)
+        for field in self._fields:
+            column = self._columns[field]
+            total += sys.getsizeof(column)
+            if field in self._encoded:
+                total += sys.getsizeof(self._values[field]) + sys.getsizeof(self._codes[field])
+                total += sum(sys.getsizeof(value) for value in self._values[field])
+            else:
+                total += sum(sys.getsizeof(value) for value in column
+                             if value is not _MISSING and value is not None)
+        return total
+
+    def _add_field(self, field: str):
+        if field in self._columns:
+            return
+        self._fields.append(field)
+        if field in self._encoded:
+            self._columns[field] = array('i', [_MISSING_CODE]) * self._length
+            self._values[field] = []
+            self._codes[field] = {}
+        else:
+            self._columns[field] = [_MISSING] * self._length
+
+    def _is_set(self, field: str) -> bool:
+        if field in self._encoded:
+            return any(code != _MISSING_CODE for code in self._columns[field])
+        return any(value is not _MISSING for value in self._columns[field])
+
+    def _encode(self, field: str, value: Any) -> int:
+        if value is _MISSING:
+            return _MISSING_CODE
+        if value is None:
+            return _NONE_CODE
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = len(self._values[field])
+            codes[value] = code
+            self._values[field].append(value)
+        return code
+
+    def _record(self, index: int) -> Dict:
+        record = {}
+        for field in self._fields:
+            if field in self._encoded:
+                code = self._columns[field][index]
+                if code == _MISSING_CODE:
+                    continue
+                record[field] = None if code == _NONE_CODE else self._values[field][code]
+            else:
+                value = self._columns[field][index]
+                if value is not _MISSING:
+                    record[field] = value
+        return record
@@ -0,0 +1,150 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import json
+import sqlite3
+import threading
+
+# Stored as real columns; anything else a record carries goes into `extra` as JSON
+COLUMNS = ['asset_id', 'date', 'license', 'author', 'media_type', 'price',
+           'thumbnail_url', 'local_thumbnail_path']
+KEY_COLUMNS = ['asset_id', 'date', 'license']
+_VALUE_COLUMNS = [c for c in COLUMNS if c not in KEY_COLUMNS] + ['extra']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    license TEXT NOT NULL,
+    author TEXT,
+    media_type TEXT,
+    price TEXT,
+    thumbnail_url TEXT,
+    local_thumbnail_path TEXT,
+    extra TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (asset_id, date, license)
+);
+-- asset_id lookups use the primary key, whose leading column it is
+CREATE INDEX IF NOT EXISTS assets_author ON assets(author);
+CREATE INDEX IF NOT EXISTS assets_date ON assets(date);
+CREATE INDEX IF NOT EXISTS assets_updated_at ON assets(updated_at);
+"""
+
+_UPSERT = f"""
+INSERT INTO assets ({', '.join(COLUMNS + ['extra', 'first_seen', 'last_seen', 'updated_at'])})
+VALUES ({', '.join('?' * (len(COLUMNS) + 4))})
+ON CONFLICT (asset_id, date, license) DO UPDATE SET
+    {', '.join(f'{c} = excluded.{c}' for c in _VALUE_COLUMNS)},
+    last_seen = excluded.last_seen,
+    updated_at = CASE WHEN {' OR '.join(f'assets.{c} IS NOT excluded.{c}' for c in _VALUE_COLUMNS)}
+                 THEN excluded.updated_at ELSE assets.updated_at END
+"""
+
+
+class ResultStore:
+    """Embedded SQLite store for scraped records.
+
+    Records are upserted on (asset_id, date, license), so repeated runs
+    refresh rows instead of piling up new files. ``updated_at`` only moves
+    when a value actually changes, which is what changed_since() queries.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Insert or update records in a single transaction; returns the number written"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for record in records:
+            if not record.get('asset_id'):
+                continue
+            extra = {k: v for k, v in record.items() if k not in COLUMNS}
+            rows.append(
+                [(record.get(c) or '') if c in KEY_COLUMNS else record.get(c) for c in COLUMNS]
+                + [json.dumps(extra, default=str) if extra else None, now, now, now]
+            )
+        with self._lock, self._db:
+            self._db.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def find(self, asset_id: Optional[str] = None, author: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None,
+             limit: Optional[int] = None) -> List[Dict]:
+        """Query records by asset, author and/or license date range.
+
+        Dates compare as stored strings, so ranges need ISO dates
+        (see DataTransformer.standardize_dates).
+        """
+        query, params = self._select(asset_id, author, since, until)
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self._fetch(query, params)
+
+    def changed_since(self, timestamp: str) -> List[Dict]:
+        """Records first stored or modified at or after an ISO timestamp"""
+        return self._fetch(
+            "SELECT * FROM assets WHERE updated_at >= ? ORDER BY updated_at", [timestamp]
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+    def to_dataframe(self, **filters):
+        """Load (optionally filtered) records into a DataFrame"""
+        import pandas as pd
+        query, params = self._select(**filters)
+        with self._lock:
+            return pd.read_sql_query(query, self._db, params=params)
+
+    def export_snapshot(self, filepath: str, format: str = 'excel', **filters) -> str:
+        """Write the current contents of the store to a file"""
+        df = self.to_dataframe(**filters)
+        if format == 'excel':
+            df.to_excel(filepath, index=False)
+        elif format == 'json':
+            df.to_json(filepath, orient='records', indent=2)
+        elif format == 'csv':
+            df.to_csv(filepath, index=False)
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+        print(f"Exported {len(df)} records from {self.path} to {filepath}")
+        return filepath
+
+    def _select(self, asset_id: Optional[str] = None, author: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None):
+        clauses, params = [], []
+        if asset_id is not None:
+            clauses.append("asset_id = ?")
+            params.append(asset_id)
+        if author is not None:
+            clauses.append("author = ?")
+            params.append(author)
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("date <= ?")
+            params.append(until)
+        query = f"SELECT {', '.join(COLUMNS)}, extra, first_seen, last_seen, updated_at FROM assets"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return query + " ORDER BY date, asset_id", params
+
+    def _fetch(self, query: str, params: List) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
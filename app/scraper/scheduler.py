@@ -0,0 +1,321 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+from urllib.parse import urlparse
+import heapq
+import itertools
+import json
+import os
+import time
+from .pagination import PageRun
+from .records import RecordBuffer
+from .throttle import AdaptiveThrottle, backoff_delay, is_client_error
+
+
+class Delayed:
+    """A task a job wants run no sooner than delay seconds from now, e.g. a retry"""
+
+    def __init__(self, task: Callable, delay: float):
+        self.task = task
+        self.delay = delay
+
+
+class SiteJob:
+    """One site to scrape, expressed as a generator of request tasks.
+
+    The generator yields zero-argument callables (or Delayed ones). The
+    scheduler runs each one on a worker thread and sends its result (or
+    throws its exception) back into the generator, which then yields the
+    next task. The generator's return value becomes ``result``.
+    """
+
+    def __init__(self, name: str, url: str, tasks: Generator, priority: int = 0,
+                 share: float = 1.0, last_run: Optional[str] = None, scraper=None):
+        self.name = name
+        self.url = url
+        self.domain = urlparse(url).netloc
+        self.tasks = tasks
+        self.priority = priority
+        self.share = share
+        self.last_run = last_run
+        self.scraper = scraper
+
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.done = False
+        self.tasks_run = 0
+        self.virtual_time = 0.0
+        self._next_task: Optional[Callable] = None
+        self._not_before = 0.0
+        self._started = False
+
+    def sort_key(self) -> Tuple:
+        # Higher priority first, then least served (weighted by share), then stalest
+        return (-self.priority, self.virtual_time, self.last_run or '')
+
+
+class JobScheduler:
+    """Runs many site jobs concurrently in one process.
+
+    Each domain has a shared AdaptiveThrottle, and its rate and concurrency
+    caps and any Retry-After block decide when the next request to that
+    domain may be dispatched. Ready jobs come off a priority queue; a job
+    whose domain is still in its politeness delay, or whose retry is not yet
+    due, is skipped, so other sites use the idle worker time. Workers never
+    sleep on a domain's behalf.
+    """
+
+    def __init__(self, max_workers: int = 8, state_path: Optional[str] = None):
+        self.max_workers = max_workers
+        self.state_path = state_path
+        self.jobs: List[SiteJob] = []
+        self.throttles: Dict[str, AdaptiveThrottle] = {}
+        self._state = self._load_state()
+        self._queue: List[Tuple] = []
+        self._sequence = itertools.count()
+        self._dispatched: Dict[str, int] = {}
+        self._next_dispatch: Dict[str, float] = {}
+
+    def throttle_for(self, domain: str, rate_limits: Optional[Dict] = None) -> AdaptiveThrottle:
+        """Shared throttle for a domain; the first config seen for it sets the limits"""
+        if domain not in self.throttles:
+            self.throttles[domain] = AdaptiveThrottle.from_config(rate_limits or {})
+        return self.throttles[domain]
+
+    def add_job(self, job: SiteJob):
+        if job.last_run is None:
+            job.last_run = self._state.get(job.name)
+        self.throttle_for(job.domain)
+        self.jobs.append(job)
+
+    def run(self) -> List[SiteJob]:
+        """Run every job to completion and return them"""
+        for job in self.jobs:
+            self._advance(job)
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while self._queue or running:
+                self._dispatch(pool, running)
+                timeout = self._time_until_ready()
+                if not running:
+                    time.sleep(timeout or 0.01)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    self._dispatched[job.domain] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._advance(job, error=e)
+                    else:
+                        self._advance(job, result)
+
+        self._save_state()
+        return self.jobs
+
+    def _dispatch(self, pool: ThreadPoolExecutor, running: Dict):
+        now = time.monotonic()
+        deferred = []
+        while self._queue and len(running) < self.max_workers:
+            entry = heapq.heappop(self._queue)
+            job = entry[-1]
+            if now < job._not_before or not self._domain_ready(job.domain, now):
+                deferred.append(entry)
+                continue
+            throttle = self.throttles[job.domain]
+            self._dispatched[job.domain] = self._dispatched.get(job.domain, 0) + 1
+            self._next_dispatch[job.domain] = now + throttle.delay
+            job.tasks_run += 1
+            running[pool.submit(job._next_task)] = job
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+
+    def _domain_ready(self, domain: str, now: float) -> bool:
+        throttle = self.throttles[domain]
+        if self._dispatched.get(domain, 0) >= throttle.in_flight_limit:
+            return False
+        return now >= self._domain_ready_at(domain)
+
+    def _domain_ready_at(self, domain: str) -> float:
+        # The throttle only learns of a dispatch once its worker starts the request
+        return max(self._next_dispatch.get(domain, 0.0), self.throttles[domain].ready_at())
+
+    def _time_until_ready(self) -> Optional[float]:
+        """Seconds until a queued job's domain leaves its politeness delay and its retry is due"""
+        now = time.monotonic()
+        waits = [
+            max(self._domain_ready_at(entry[-1].domain), entry[-1]._not_before) - now
+            for entry in self._queue
+            if self._dispatched.get(entry[-1].domain, 0) < self.throttles[entry[-1].domain].in_flight_limit
+        ]
+        if not waits:
+            return None
+        return max(0.0, min(waits))
+
+    def _advance(self, job: SiteJob, result=None, error: Optional[Exception] = None):
+        """Feed the last task's outcome to the job and queue its next task"""
+        try:
+            if error is not None:
+                task = job.tasks.throw(error)
+            elif not job._started:
+                job._started = True
+                task = next(job.tasks)
+            else:
+                task = job.tasks.send(result)
+        except StopIteration as stop:
+            self._finish(job, result=stop.value)
+            return
+        except Exception as e:
+            print(f"Job {job.name} failed: {e}")
+            self._finish(job, error=e)
+            return
+
+        job._not_before = 0.0
+        if isinstance(task, Delayed):
+            job._not_before = time.monotonic() + task.delay
+            task = task.task
+        job._next_task = task
+        job.virtual_time += 1.0 / job.share
+        heapq.heappush(self._queue, (job.sort_key(), next(self._sequence), job))
+
+    def _finish(self, job: SiteJob, result=None, error: Optional[Exception] = None):
+        job.done = True
+        job.result = result
+        job.error = error
+        if error is None:
+            job.last_run = datetime.now().isoformat()
+            self._state[job.name] = job.last_run
+
+    def _load_state(self) -> Dict[str, str]:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        with open(self.state_path, 'w') as f:
+            json.dump(self._state, f, indent=2)
+
+
+def page_tasks(scraper, url: str, selectors: List[str], max_retries: int = 3) -> Generator:
+    """Task generator for one site: one fetch-and-extract task per page.
+
+    Failed pages and the end of the listing are handled by a PageRun, as
+    in UniversalScraper._scrape_pages.
+    """
+    records = RecordBuffer()
+    run = PageRun(max_consecutive_failures=scraper.max_consecutive_failures, label=f" of {url}")
+    scraper.failed_pages = run.failed_pages
+
+    while (page := run.next_page()) is not None:
+        try:
+            page_data, has_next = yield from _page_attempts(scraper, url, page, selectors, max_retries)
+        except Exception as e:
+            run.failed(page, e)
+            continue
+        records.extend(page_data)
+        run.succeeded(page, has_next=bool(page_data) and has_next)
+
+    return records
+
+
+def _page_attempts(scraper, url: str, page: int, selectors: List[str], max_retries: int) -> Generator:
+    """Yield a page's task until it succeeds, re-queueing it with jittered backoff.
+
+    The delay is left to the scheduler (see Delayed), and a Retry-After
+    blocks the domain's throttle, so no worker sleeps between attempts.
+    """
+    task = partial(_scrape_page, scraper, url, page, selectors)
+    delay = 0.0
+    for attempt in range(max_retries):
+        try:
+            return (yield Delayed(task, delay) if delay else task)
+        except Exception as e:
+            if is_client_error(e) or attempt == max_retries - 1:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Attempt {attempt + 1} on page {page} of {url} failed ({e}), retrying in {delay:.1f}s...")
+
+
+def _scrape_page(scraper, url: str, page: int, selectors: List[str]):
+    # A single attempt; retries are scheduled by _page_attempts instead of slept through
+    html_content = scraper._fetch_page(url, page, max_retries=1)
+    return scraper._extract_data(html_content, selectors), scraper._has_next_page(html_content)
+
+
+def load_site_jobs(config_dir: str, scheduler: JobScheduler,
+                   scraper_factory: Optional[Callable] = None) -> List[SiteJob]:
+    """Build a job for every site config with a base_url, row selectors and a data_mapping"""
+    if scraper_factory is None:
+        scraper_factory = _default_scraper
+
+    jobs = []
+    for filename in sorted(os.listdir(config_dir)):
+        if not filename.endswith('.json'):
+            continue
+        path = os.path.join(config_dir, filename)
+        with open(path, 'r') as f:
+            config = json.load(f)
+        selectors = config.get('selectors', {})
+        if not config.get('base_url') or 'row' not in selectors:
+            continue
+        if not config.get('data_mapping'):
+            print(f"Skipping {filename}: no data_mapping to name the row's cells")
+            continue
+
+        url = config['base_url'] + config.get('license_history_url', '')
+        scraper = scraper_factory(path)
+        rate_limits = config.get('required_elements', {}).get('rate_limits', {})
+        scraper.throttle = scheduler.throttle_for(urlparse(url).netloc, rate_limits)
+
+        jobs.append(SiteJob(
+            name=os.path.splitext(filename)[0],
+            url=url,
+            tasks=page_tasks(scraper, url, [selectors['row'], selectors.get('columns', 'td'),
+                                            selectors.get('thumbnail', 'img')]),
+            priority=config.get('priority', 0),
+            share=config.get('share', 1.0),
+            scraper=scraper
+        ))
+    return jobs
+
+
+def _default_scraper(config_path: str):
+    from .configured import ConfiguredScraper
+    scraper = ConfiguredScraper(None, config_path)
+    # Sites such as the license history are only served to a logged-in session
+    if not scraper.load_cookies():
+        print(f"No cookies found at {scraper.cookies_path}; scraping {config_path} without a session")
+    return scraper
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Scrape every configured site in one process")
+    parser.add_argument('config_dir', nargs='?', default='/app/config/site_configs')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    scheduler = JobScheduler(args.workers, state_path='/data/output/scheduler_state.json')
+    for job in load_site_jobs(args.config_dir, scheduler):
+        scheduler.add_job(job)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    for job in scheduler.run():
+        if job.error:
+            print(f"{job.name}: failed ({job.error})")
+        elif job.result:
+            print(f"{job.name}: {len(job.result)} records")
+            job.scraper._export_to_excel(job.result, f"{job.name}_{timestamp}.xlsx")
+
+
+if __name__ == "__main__":
+    main()
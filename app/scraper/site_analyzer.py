@@ -1,13 +1,16 @@
 from typing import Dict, List
 from bs4 import BeautifulSoup
+import re
 import requests
 from urllib.parse import urljoin, urlparse
+from .pagination import discover_pagination, is_pagination_container
 
 class SiteAnalyzer:
     def __init__(self, ai_assistant):
         self.ai_assistant = ai_assistant
         self.analyzed_urls = set()
         self.site_map = {}
+        self._page_html = {}
 
     def analyze_site(self, base_url: str, max_pages: int = 5) -> Dict:
         """Analyze site structure and patterns"""
@@ -24,6 +27,7 @@ class SiteAnalyzer:
                 
             self._analyze_page(url)
         
+        self._analyze_structures()
         return self._generate_site_report()
 
     def _analyze_page(self, url: str) -> None:
@@ -32,11 +36,11 @@ class SiteAnalyzer:
             response = requests.get(url)
             soup = BeautifulSoup(response.text, 'lxml')
             
-            # Analyze page structure using AI
-            structure = self.ai_assistant.analyze_page_structure(response.text)
+            # AI structure analysis runs later for all pages at once
+            self._page_html[url] = response.text
             
             self.site_map[url] = {
-                'structure': structure,
+                'structure': None,
                 'forms': self._analyze_forms(soup),
                 'navigation': self._analyze_navigation(soup),
                 'data_tables': self._analyze_tables(soup)
@@ -47,6 +51,20 @@ class SiteAnalyzer:
         except Exception as e:
             print(f"Error analyzing {url}: {e}")
 
+    def _analyze_structures(self) -> None:
+        """Analyze the structure of every fetched page with batched, concurrent AI calls"""
+        if not self._page_html:
+            return
+        urls = list(self._page_html)
+        try:
+            structures = self.ai_assistant.analyze_pages_batch([self._page_html[url] for url in urls])
+            for url, structure in zip(urls, structures):
+                self.site_map[url]['structure'] = structure
+        except Exception as e:
+            print(f"Error analyzing page structures: {e}")
+        finally:
+            self._page_html.clear()
+
     def _analyze_forms(self, soup: BeautifulSoup) -> List[Dict]:
         """Analyze forms and their fields"""
         forms = []
@@ -92,6 +110,19 @@ class SiteAnalyzer:
         
         return navigation
 
+    def _determine_nav_type(self, nav) -> str:
+        """Classify a nav/header/footer element as pagination, breadcrumbs or main navigation"""
+        if is_pagination_container(nav) or nav.find(is_pagination_container):
+            return 'pagination'
+        label = ' '.join([nav.get('id') or '', nav.get('aria-label') or ''] + list(nav.get('class') or []))
+        if re.search(r'breadcrumb', label, re.IGNORECASE) or nav.find(itemtype=re.compile('BreadcrumbList')):
+            return 'breadcrumbs'
+        return 'main'
+
+    def _extract_pagination(self, nav) -> Dict:
+        """Describe pagination controls: URL scheme, parameter and total pages, if shown"""
+        return discover_pagination(str(nav), getattr(self, 'base_url', '')).to_dict()
+
     def _analyze_tables(self, soup: BeautifulSoup) -> List[Dict]:
         """Analyze data tables"""
         tables = []
@@ -127,17 +158,20 @@ class SiteAnalyzer:
         }
 
     def _identify_patterns(self) -> Dict:
-        """Identify common patterns across pages"""
+        """Identify common patterns across pages, with batched, concurrent AI calls"""
         patterns = {
             'selectors': {},
             'structures': {},
             'navigation': {}
         }
         
-        # Analyze patterns using AI
-        for url, data in self.site_map.items():
-            structure = data['structure']
-            self.ai_assistant.analyze_patterns(structure, patterns)
+        structures = [data['structure'] for data in self.site_map.values() if data['structure']]
+        if not structures:
+            return patterns
+        try:
+            patterns = self.ai_assistant.identify_patterns(structures)
+        except Exception as e:
+            print(f"Error identifying patterns: {e}")
         
         return patterns
 
@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import codecs
+import re
+from lxml import etree
+
+# Columns of a license history row, in table order
+LICENSE_COLUMNS = ['date', 'author', 'asset_id', 'license', 'media_type', 'price']
+
+_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def response_encoding(response) -> Optional[str]:
+    """Charset declared in the Content-Type header, if any.
+
+    Unlike response.encoding this does not fall back to ISO-8859-1, so lxml
+    can still pick up a <meta charset> from the document itself.
+    """
+    match = _CHARSET.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+
+class ChunkEdges:
+    """Pass byte chunks through, keeping the first and last size bytes of the body.
+
+    A listing's pagination controls and count labels sit above or below its
+    rows, so the edges are enough for discover_pagination without holding
+    the whole page.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], size: int = 64 * 1024):
+        self._chunks = chunks
+        self.size = size
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            taken = max(0, self.size - len(self._head))
+            self._head += chunk[:taken]
+            self._tail += chunk[taken:]
+            if len(self._tail) > 2 * self.size:
+                del self._tail[:-self.size]
+            yield chunk
+
+    def text(self, encoding: Optional[str] = None) -> str:
+        """The head and tail of the body read so far, decoded"""
+        body = bytes(self._head) + bytes(self._tail[-self.size:])
+        return body.decode(encoding or 'utf-8', errors='replace')
+
+
+def iter_row_elements(chunks: Iterable[bytes], row_tag: str = 'tr',
+                      encoding: Optional[str] = None) -> Iterator[etree._Element]:
+    """Incrementally parse raw HTML bytes and yield each row as it closes.
+
+    A yielded element is only valid until the next iteration: it is cleared
+    afterwards and processed rows are detached, so the partial tree only ever
+    holds the current row and the one being parsed. Nested row elements are
+    not supported.
+    """
+    if encoding:
+        # libxml2 does not know every Python alias (e.g. "latin-1")
+        encoding = codecs.lookup(encoding).name
+    parser = etree.HTMLPullParser(events=('end',), tag=row_tag, encoding=encoding)
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            yield from _drain(parser)
+    parser.close()
+    yield from _drain(parser)
+
+
+def iter_rows(chunks: Iterable[bytes], columns: List[str] = LICENSE_COLUMNS,
+              row_tag: str = 'tr', cell_tag: str = 'td', image_tag: str = 'img',
+              encoding: Optional[str] = None) -> Iterator[Dict]:
+    """Stream rows with at least len(columns) cells as records"""
+    for row in iter_row_elements(chunks, row_tag, encoding):
+        cells = list(row.iter(cell_tag))
+        if len(cells) < len(columns):
+            continue
+        record = {
+            name: ''.join(cell.itertext()).strip()
+            for name, cell in zip(columns, cells)
+        }
+        img = next(row.iter(image_tag), None)
+        if img is not None and img.get('src'):
+            record['thumbnail_url'] = img.get('src')
+        yield record
+
+
+def _drain(parser: etree.HTMLPullParser) -> Iterator[etree._Element]:
+    for _, element in parser.read_events():
+        # Earlier siblings are already processed; drop them from the tree
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+        yield element
+        element.clear(keep_tail=True)
@@ -0,0 +1,191 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import random
+import threading
+import time
+import requests
+
+# Statuses that mean "slow down" rather than "this request is broken"
+THROTTLE_STATUSES = {429, 503}
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveThrottle:
+    """AIMD controller for request rate and concurrency.
+
+    Healthy responses raise the rate (and the number of requests allowed in
+    flight) additively; 429/503 responses or a latency spike cut both
+    multiplicatively. A Retry-After value blocks new requests until it expires.
+    """
+
+    def __init__(self, initial_rate: float = 0.5, min_rate: float = 0.05,
+                 max_rate: float = 10.0, rate_increase: float = 0.1,
+                 decrease_factor: float = 0.5, initial_concurrency: int = 1,
+                 max_concurrency: int = 8, latency_factor: float = 2.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+        self.concurrency = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency_factor = latency_factor
+        self.latency = None  # EWMA of healthy response latency
+
+        self._in_flight = 0
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, rate_limits: dict) -> 'AdaptiveThrottle':
+        """Build a throttle from a site config's rate_limits section.
+
+        requests_per_minute and concurrent_requests are the site's limits: the
+        throttle starts at them and never ramps past them, unless
+        max_requests_per_minute / max_concurrent_requests allow more.
+        """
+        throttle = cls()
+        if rate_limits.get('requests_per_minute'):
+            throttle.rate = throttle.max_rate = rate_limits['requests_per_minute'] / 60
+        if rate_limits.get('concurrent_requests'):
+            throttle.concurrency = float(rate_limits['concurrent_requests'])
+            throttle.max_concurrency = rate_limits['concurrent_requests']
+        if rate_limits.get('max_requests_per_minute'):
+            throttle.max_rate = rate_limits['max_requests_per_minute'] / 60
+        if rate_limits.get('max_concurrent_requests'):
+            throttle.max_concurrency = rate_limits['max_concurrent_requests']
+        return throttle
+
+    @property
+    def delay(self) -> float:
+        """Current spacing between request starts, in seconds"""
+        return 1.0 / self.rate
+
+    @property
+    def in_flight_limit(self) -> int:
+        return max(1, int(self.concurrency))
+
+    def ready_at(self) -> float:
+        """Monotonic time from which a new request may start, given the rate and any Retry-After block"""
+        with self._condition:
+            return max(self._next_slot, self._blocked_until)
+
+    def acquire(self):
+        """Block until a request may start"""
+        with self._condition:
+            while self._in_flight >= self.in_flight_limit:
+                self._condition.wait()
+            self._in_flight += 1
+            now = time.monotonic()
+            start = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, latency: float):
+        """Additive increase after a healthy response"""
+        with self._condition:
+            spike = self.latency is not None and latency > self.latency * self.latency_factor
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if spike:
+                self._decrease()
+                return
+            self.rate = min(self.max_rate, self.rate + self.rate_increase)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            self._condition.notify_all()
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease after a 429/503, honoring Retry-After"""
+        with self._condition:
+            self._decrease()
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def _decrease(self):
+        # Several in-flight requests usually see the same congestion; cut once per interval
+        now = time.monotonic()
+        if now - self._last_decrease < self.delay:
+            return
+        self._last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+
+
+def is_client_error(error: Exception) -> bool:
+    """Whether an error is a non-retryable 4xx response, e.g. a page past the end of a listing"""
+    response = getattr(error, 'response', None)
+    return (isinstance(error, requests.HTTPError) and response is not None
+            and 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_STATUSES)
+
+
+def fetch_with_backoff(session: requests.Session, url: str,
+                       throttle: Optional[AdaptiveThrottle] = None,
+                       max_retries: int = 3, **kwargs) -> requests.Response:
+    """GET a URL through the throttle, retrying with jittered backoff"""
+    throttle = throttle or AdaptiveThrottle()
+    for attempt in range(max_retries):
+        retry_after = None
+        with throttle.slot():
+            started = time.monotonic()
+            try:
+                response = session.get(url, **kwargs)
+                error = None
+            except requests.RequestException as e:
+                response, error = None, e
+            latency = time.monotonic() - started
+
+        if response is not None:
+            if response.status_code in THROTTLE_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                throttle.on_throttle(retry_after)
+            elif response.status_code < 500:
+                throttle.on_success(latency)
+
+            if response.status_code not in RETRYABLE_STATUSES:
+                response.raise_for_status()
+                return response
+            error = requests.HTTPError(f"{response.status_code} response", response=response)
+
+        if attempt == max_retries - 1:
+            raise Exception(f"Failed to fetch {url} after {max_retries} attempts: {error}")
+        delay = max(backoff_delay(attempt), retry_after or 0)
+        print(f"Attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s...")
+        time.sleep(delay)
@@ -0,0 +1,194 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import tempfile
+from PIL import Image, ImageDraw, ImageOps
+from .records import RecordBuffer
+from .thumbnail_store import ThumbnailStore
+
+# Variant name -> (edge length in px, Pillow format). xlsxwriter can only embed the JPEG one.
+DEFAULT_VARIANTS = {
+    'webp': (256, 'WEBP'),
+    'jpeg': (256, 'JPEG'),
+}
+
+_SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+_LABEL_HEIGHT = 16
+
+
+def variant_key(size: int, format: str) -> str:
+    """Index key of a variant; it changes with size or format, so old variants are never reused"""
+    return f"{size}_{format.lower()}"
+
+
+def variant_field(name: str) -> str:
+    """Record field holding the path of a variant"""
+    return f"thumbnail_{name}_path"
+
+
+class ThumbnailProcessor:
+    """Derives fixed-size variants and contact sheets from stored thumbnails.
+
+    Work is spread over a process pool. Variants are keyed by blob hash plus
+    size and format, so identical images are processed once and a rerun only
+    touches blobs added since the last one.
+    """
+
+    def __init__(self, store: ThumbnailStore, variants: Optional[Dict[str, Tuple[int, str]]] = None,
+                 workers: Optional[int] = None):
+        self.store = store
+        self.variants = DEFAULT_VARIANTS if variants is None else variants
+        self.workers = workers
+
+    def process(self) -> int:
+        """Render missing variants for every stored blob; returns the number of blobs processed"""
+        keys = {name: variant_key(size, format) for name, (size, format) in self.variants.items()}
+        done = {key: self.store.processed_hashes(key) for key in keys.values()}
+
+        jobs = []
+        for blob in self.store.iter_blobs():
+            todo = [
+                (keys[name], size, format)
+                for name, (size, format) in self.variants.items()
+                if blob['hash'] not in done[keys[name]]
+            ]
+            if todo:
+                jobs.append((self.store.root, blob['path'], blob['hash'], todo))
+        if not jobs:
+            return 0
+
+        processed = 0
+        for digest, variants, error in self._map(_render_variants, jobs):
+            if error:
+                print(f"Error processing thumbnail {digest}: {error}")
+                continue
+            self.store.add_variants(digest, variants)
+            processed += 1
+        print(f"Processed {processed} thumbnails")
+        return processed
+
+    def annotate(self, records):
+        """Set the variant path fields (see variant_field) on records, in place"""
+        for name, (size, format) in self.variants.items():
+            paths = self.store.variant_paths(variant_key(size, format))
+            field = variant_field(name)
+            if isinstance(records, RecordBuffer):
+                records.set_column(field, [paths.get(asset_id) for asset_id in records.column('asset_id')])
+            else:
+                for record in records:
+                    record[field] = paths.get(record.get('asset_id'))
+        return records
+
+    def contact_sheets(self, records: Iterable[Dict], output_dir: str, variant: str = 'jpeg',
+                       columns: int = 8, rows: int = 8) -> List[str]:
+        """Write paged contact-sheet JPEGs per media_type; returns their paths"""
+        size, format = self.variants[variant]
+        paths = self.store.variant_paths(variant_key(size, format))
+
+        groups: Dict[str, Dict[str, str]] = {}
+        for record in records:
+            asset_id = record.get('asset_id')
+            if asset_id in paths:
+                groups.setdefault(record.get('media_type') or 'unknown', {})[asset_id] = paths[asset_id]
+
+        per_page = columns * rows
+        jobs = []
+        for media_type, assets in sorted(groups.items()):
+            items = list(assets.items())
+            for page, start in enumerate(range(0, len(items), per_page), 1):
+                target = os.path.join(output_dir, f"contact_sheet_{_slug(media_type)}_{page:03d}.jpg")
+                jobs.append((items[start:start + per_page], target, size, columns))
+        if not jobs:
+            return []
+
+        os.makedirs(output_dir, exist_ok=True)
+        sheets = list(self._map(_render_contact_sheet, jobs))
+        print(f"Wrote {len(sheets)} contact sheets to {output_dir}")
+        return sheets
+
+    def _map(self, function, jobs: List):
+        chunksize = max(1, len(jobs) // ((self.workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            yield from pool.map(function, jobs, chunksize=chunksize)
+
+
+def _variant_path(digest: str, size: int, format: str) -> str:
+    extension = 'jpg' if format == 'JPEG' else format.lower()
+    return os.path.join('variants', variant_key(size, format), digest[:2], digest[2:4],
+                        f"{digest}.{extension}")
+
+
+def _normalize(image: Image.Image, size: int, format: str) -> Image.Image:
+    """Letterbox into an exact size x size square; JPEG gets a white background"""
+    if format == 'JPEG':
+        image = _flatten(image)
+        return ImageOps.pad(image, (size, size), method=Image.LANCZOS, color=(255, 255, 255))
+    return ImageOps.pad(image.convert('RGBA'), (size, size), method=Image.LANCZOS, color=(0, 0, 0, 0))
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _save_atomic(image: Image.Image, path: str, format: str):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format=format, **_SAVE_OPTIONS.get(format, {}))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _render_variants(job) -> Tuple[str, Dict[str, str], Optional[str]]:
+    """Process-pool worker: decode a blob once and write each missing variant"""
+    root, path, digest, todo = job
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            variants = {}
+            for key, size, format in todo:
+                relpath = _variant_path(digest, size, format)
+                target = os.path.join(root, relpath)
+                # Present on disk but not indexed (e.g. an interrupted run)
+                if not os.path.exists(target):
+                    _save_atomic(_normalize(image, size, format), target, format)
+                variants[key] = relpath
+        return digest, variants, None
+    except Exception as e:
+        return digest, {}, str(e)
+
+
+def _render_contact_sheet(job) -> str:
+    """Process-pool worker: tile one page of variant images, labelled with asset_id"""
+    items, target, size, columns = job
+    rows = -(-len(items) // columns)
+    sheet = Image.new('RGB', (columns * size, rows * (size + _LABEL_HEIGHT)), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+    for i, (asset_id, path) in enumerate(items):
+        x = (i % columns) * size
+        y = (i // columns) * (size + _LABEL_HEIGHT)
+        try:
+            with Image.open(path) as image:
+                sheet.paste(_flatten(image), (x, y))
+        except OSError as e:
+            print(f"Error adding {asset_id} to contact sheet: {e}")
+        draw.text((x + 4, y + size + 2), str(asset_id), fill=(0, 0, 0))
+    _save_atomic(sheet, target, 'JPEG')
+    return target
+
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', value).strip('_').lower() or 'unknown'
@@ -0,0 +1,249 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import tempfile
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT
+);
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_hash ON assets(hash);
+CREATE TABLE IF NOT EXISTS variants (
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    variant TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (hash, variant)
+);
+"""
+
+
+class ThumbnailStore:
+    """Content-addressed thumbnail storage with a SQLite index.
+
+    Blobs are named by their SHA-256 and sharded into two directory levels
+    (``ab/cd/abcd....jpg``), so identical images are stored once and no
+    directory grows unbounded. The index maps asset_id to blob, size and the
+    HTTP validators needed for conditional refreshes.
+    """
+
+    def __init__(self, root: str, index_name: str = 'index.sqlite3'):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, index_name), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def has(self, asset_id: str) -> bool:
+        """Check whether an asset has a stored thumbnail"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM assets WHERE asset_id = ?", (asset_id,)
+            ).fetchone()
+        return row is not None
+
+    def lookup(self, asset_id: str) -> Optional[Dict]:
+        """Return the index entry for an asset, including its blob path"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT a.asset_id, a.hash, a.url, a.etag, a.last_modified, a.stored_at, "
+                "b.path, b.size, b.content_type "
+                "FROM assets a JOIN blobs b ON a.hash = b.hash WHERE a.asset_id = ?",
+                (asset_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['path'] = os.path.join(self.root, entry['path'])
+        return entry
+
+    def get_path(self, asset_id: str) -> Optional[str]:
+        entry = self.lookup(asset_id)
+        return entry['path'] if entry else None
+
+    def put(self, asset_id: str, content: bytes, url: Optional[str] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None,
+            content_type: Optional[str] = None) -> str:
+        """Store image bytes for an asset and return the blob path"""
+        digest = hashlib.sha256(content).hexdigest()
+        relpath = self._blob_path(digest, content_type, url)
+        path = os.path.join(self.root, relpath)
+
+        with self._lock:
+            row = self._db.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                self._write_atomic(path, content)
+            else:
+                # Same image already stored for another asset
+                relpath = row['path']
+                path = os.path.join(self.root, relpath)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, path, size, content_type) VALUES (?, ?, ?, ?)",
+                    (digest, relpath, len(content), content_type)
+                )
+                self._db.execute(
+                    "INSERT INTO assets (asset_id, hash, url, etag, last_modified, stored_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(asset_id) DO UPDATE SET hash = excluded.hash, url = excluded.url, "
+                    "etag = excluded.etag, last_modified = excluded.last_modified, "
+                    "stored_at = excluded.stored_at",
+                    (asset_id, digest, url, etag, last_modified, datetime.now().isoformat())
+                )
+        return path
+
+    def touch(self, asset_id: str):
+        """Mark an asset as revalidated without changing its blob"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE assets SET stored_at = ? WHERE asset_id = ?",
+                (datetime.now().isoformat(), asset_id)
+            )
+
+    def add_variants(self, digest: str, variants: Dict[str, str]):
+        """Index derived images of a blob, as variant key -> path relative to the root"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO variants (hash, variant, path) VALUES (?, ?, ?)",
+                [(digest, variant, path) for variant, path in variants.items()]
+            )
+
+    def processed_hashes(self, variant: str) -> Set[str]:
+        """Hashes of the blobs that already have a given variant"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT hash FROM variants WHERE variant = ?", (variant,)
+            ).fetchall()
+        return {row['hash'] for row in rows}
+
+    def variant_paths(self, variant: str) -> Dict[str, str]:
+        """Map every asset_id with a given variant to its absolute path"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.asset_id, v.path FROM assets a JOIN variants v ON a.hash = v.hash "
+                "WHERE v.variant = ?",
+                (variant,)
+            ).fetchall()
+        return {row['asset_id']: os.path.join(self.root, row['path']) for row in rows}
+
+    def iter_blobs(self) -> Iterator[Dict]:
+        """Yield every stored blob (hash, absolute path, size)"""
+        with self._lock:
+            rows = self._db.execute("SELECT hash, path, size, content_type FROM blobs").fetchall()
+        for row in rows:
+            blob = dict(row)
+            blob['path'] = os.path.join(self.root, blob['path'])
+            yield blob
+
+    def verify(self, check_hash: bool = False) -> List[Dict]:
+        """Check that indexed blobs exist with the expected size (and hash).
+
+        Returns a list of problems, each with the blob hash and a reason.
+        """
+        problems = []
+        for blob in self.iter_blobs():
+            try:
+                size = os.path.getsize(blob['path'])
+            except OSError:
+                problems.append({'hash': blob['hash'], 'reason': 'missing'})
+                continue
+            if size != blob['size']:
+                problems.append({'hash': blob['hash'], 'reason': 'size mismatch'})
+            elif check_hash and self._hash_file(blob['path']) != blob['hash']:
+                problems.append({'hash': blob['hash'], 'reason': 'hash mismatch'})
+        return problems
+
+    def collect_garbage(self) -> int:
+        """Delete blobs (and their variants) that no asset references; returns the number removed"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT hash, path FROM blobs WHERE hash NOT IN (SELECT hash FROM assets)"
+            ).fetchall()
+            with self._db:
+                for row in rows:
+                    variants = self._db.execute(
+                        "SELECT path FROM variants WHERE hash = ?", (row['hash'],)
+                    ).fetchall()
+                    for path in [row['path']] + [variant['path'] for variant in variants]:
+                        try:
+                            os.remove(os.path.join(self.root, path))
+                        except FileNotFoundError:
+                            pass
+                    self._db.execute("DELETE FROM variants WHERE hash = ?", (row['hash'],))
+                    self._db.execute("DELETE FROM blobs WHERE hash = ?", (row['hash'],))
+        return len(rows)
+
+    def remove(self, asset_id: str):
+        """Drop an asset from the index; its blob is freed by collect_garbage"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM assets WHERE asset_id = ?", (asset_id,))
+
+    def import_flat_files(self, extensions=('.jpg',)) -> int:
+        """Move {asset_id}.jpg files of the old flat layout into the store.
+
+        Each file is hashed and indexed under its asset_id (unless the asset
+        already has a thumbnail) and then deleted, so this is a one-time
+        migration; returns the number of files moved.
+        """
+        imported = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                asset_id, extension = os.path.splitext(entry.name)
+                if not entry.is_file() or extension.lower() not in extensions:
+                    continue
+                if not self.has(asset_id):
+                    with open(entry.path, 'rb') as f:
+                        self.put(asset_id, f.read())
+                os.remove(entry.path)
+                imported += 1
+        return imported
+
+    def _blob_path(self, digest: str, content_type: Optional[str], url: Optional[str]) -> str:
+        extension = None
+        if content_type:
+            extension = mimetypes.guess_extension(content_type.split(';')[0].strip())
+        if not extension and url:
+            extension = os.path.splitext(url.split('?')[0])[1] or None
+        if extension in (None, '.jpe', '.jpeg'):
+            extension = '.jpg'
+        return os.path.join(digest[:2], digest[2:4], digest + extension)
+
+    @staticmethod
+    def _write_atomic(path: str, content: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
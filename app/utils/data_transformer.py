@@ -19,10 +19,19 @@ class DataTransformer:
     
     @staticmethod
     def standardize_dates(data: List[Dict], date_field: str) -> List[Dict]:
+        if hasattr(data, 'map_column'):
+            # A RecordBuffer builds its records on access, so convert the column itself
+            if date_field in data.fields:
+                data.map_column(date_field, DataTransformer._standardize_date)
+            return data
         for item in data:
             if date_field in item:
-                try:
-                    item[date_field] = pd.to_datetime(item[date_field]).strftime('%Y-%m-%d')
-                except:
-                    pass
-        return data 
\ No newline at end of file
+                item[date_field] = DataTransformer._standardize_date(item[date_field])
+        return data
+
+    @staticmethod
+    def _standardize_date(value):
+        try:
+            return pd.to_datetime(value).strftime('%Y-%m-%d')
+        except:
+            return value 
\ No newline at end of file
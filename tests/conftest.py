@@ -0,0 +1,77 @@
+import threading
+import time
+import requests
+
+def license_table(page, rows=1):
+    """A license history table whose asset ids are "<page>-<row>" """
+    cells = "<td>2024-01-01</td><td>A</td><td>{}</td><td>Std</td><td>Image</td><td>$1</td>"
+    return "<table>" + "".join(f"<tr>{cells.format(f'{page}-{i}')}</tr>" for i in range(rows)) + "</table>"
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text="ok", url=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+        self.url = url
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+    def iter_content(self, chunk_size=1):
+        body = self.text.encode()
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+class FakeSite:
+    """Session serving render(page) for ?page=N requests, as a FakeResponse or HTML.
+
+    Records the pages requested, those requested as streams and the peak
+    number of requests in flight; each request takes delay seconds.
+    """
+
+    def __init__(self, render, delay=0.0):
+        self.render = render
+        self.delay = delay
+        self.requested = []
+        self.streamed = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        page = int((params or {}).get("page", 1))
+        with self.lock:
+            self.requested.append(page)
+            if kwargs.get("stream"):
+                self.streamed.append(page)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        response = self.render(page)
+        if isinstance(response, str):
+            response = FakeResponse(text=response)
+        response.url = url
+        return response
+
+class FakePageAssistant:
+    """AI assistant that finds table rows on every page and accepts all of them.
+
+    analyze(html_content) and validate(rows) replace the structure analysis
+    and the validation verdict, e.g. to make a page fail.
+    """
+
+    def __init__(self, analyze=None, validate=None):
+        self.analyze = analyze
+        self.validate = validate
+
+    async def analyze_page_structure_async(self, html_content):
+        return self.analyze(html_content) if self.analyze else {}
+
+    async def generate_selectors_async(self, target_data, structure):
+        return ["tr", "td", "img"]
+
+    async def validate_data_async(self, data):
+        return self.validate(data) if self.validate else (True, "ok")
@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import json
+import pytest
+from app.ai_assistant.base import SYSTEM_PROMPT, AIAssistant
+
+class FakeAssistant(AIAssistant):
+    provider = "fake"
+
+    def __init__(self, config_path, replies=None):
+        super().__init__(config_path)
+        self.replies = replies or {}
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+
+    def _complete(self, prompt, max_tokens, temperature):
+        raise AssertionError("async path should use _complete_async")
+
+    async def _complete_async(self, prompt, max_tokens, temperature):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        for marker, reply in self.replies.items():
+            if marker in prompt:
+                return self._remember(prompt, reply)
+        return self._remember(prompt, '{"valid": true, "message": "ok"}')
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "ai_config.json"
+    path.write_text(json.dumps({"fake": {"max_concurrency": 2}}))
+    return str(path)
+
+def test_concurrency_is_bounded_per_provider(config_path):
+    assistant = FakeAssistant(config_path)
+
+    async def run():
+        return await asyncio.gather(*(assistant.validate_data_async([{"id": i}]) for i in range(6)))
+
+    results = asyncio.run(run())
+    assert results == [(True, "ok")] * 6
+    assert assistant.peak == 2
+
+def test_batch_analysis_packs_pages_into_fewer_calls(config_path):
+    assistant = FakeAssistant(config_path, {
+        "3 HTML pages": json.dumps([{"page": 1}, {"page": 2}, {"page": 3}]),
+        "2 HTML pages": json.dumps([{"a": 1}, {"b": 2}])
+    })
+    pages = [f"<html>{i}</html>" for i in range(5)]
+
+    structures = assistant.analyze_pages_batch(pages, batch_size=3)
+    assert structures == [{"page": 1}, {"page": 2}, {"page": 3}, {"a": 1}, {"b": 2}]
+    assert len(assistant.prompts) == 2
+
+def test_batch_falls_back_to_single_calls(config_path):
+    assistant = FakeAssistant(config_path, {"HTML pages": "not json", "HTML content": '{"single": true}'})
+    structures = assistant.analyze_pages_batch(["<p>a</p>", "<p>b</p>"], batch_size=2)
+    assert structures == [{"single": True}, {"single": True}]
+
+def test_patterns_are_batched_and_merged(config_path):
+    assistant = FakeAssistant(config_path, {
+        "2 page structures": json.dumps({"selectors": {"row": "tr"}, "navigation": {"pager": "nav"}}),
+        "1 page structures": json.dumps({"selectors": {"price": "td.price"}})
+    })
+    patterns = assistant.identify_patterns([{"page": i} for i in range(3)], batch_size=2)
+    assert patterns == {
+        "selectors": {"row": "tr", "price": "td.price"},
+        "structures": {},
+        "navigation": {"pager": "nav"}
+    }
+    assert len(assistant.prompts) == 2
+
+def test_parse_selectors():
+    parse = FakeAssistant.__new__(FakeAssistant)._parse_selectors
+    assert parse('```json\n["tr:has(td)", "td", "img"]\n```') == ["tr:has(td)", "td", "img"]
+    assert parse("1. tr.row\n2. td") == ["tr.row", "td"]
+
+def test_prompts_keep_instructions_in_the_shared_prefix(config_path):
+    assistant = FakeAssistant(config_path)
+    prompts = [
+        assistant._structure_prompt("<html></html>"),
+        assistant._selectors_prompt("prices", {"rows": "tr"}),
+        assistant._validation_prompt([{"id": 1}]),
+        assistant._batch_structure_prompt(["<p>a</p>", "<p>b</p>"]),
+        assistant._patterns_prompt([{"rows": "tr"}]),
+    ]
+    for prompt in prompts:
+        task = prompt.splitlines()[0]
+        assert task.startswith("Task: ")
+        assert task in SYSTEM_PROMPT
+        assert "Return" not in prompt
+
+def test_history_is_bounded_and_streamed(tmp_path):
+    path = tmp_path / "ai_config.json"
+    history_path = str(tmp_path / "history.jsonl.gz")
+    path.write_text(json.dumps({"history_limit": 3, "history_path": history_path}))
+    assistant = FakeAssistant(str(path))
+
+    for i in range(5):
+        asyncio.run(assistant.validate_data_async([{"id": i}]))
+    assert len(assistant.conversation_history) == 3
+    assistant.close()
+    streamed = list(AIAssistant.load_conversation(history_path))
+    assert len(streamed) == 5
+    assert streamed[-1] == assistant.conversation_history[-1]
+
+    saved = str(tmp_path / "saved.jsonl.gz")
+    assistant.save_conversation(saved)
+    with gzip.open(saved, "rt") as f:
+        assert [json.loads(line) for line in f] == list(assistant.conversation_history)
+    assistant.save_conversation(str(tmp_path / "saved.json"))
+    assert json.loads((tmp_path / "saved.json").read_text()) == list(assistant.conversation_history)
+
+def test_unclosed_history_is_read_up_to_the_last_flush(tmp_path):
+    path = tmp_path / "history.jsonl.gz"
+    with open(path, "wb") as raw:
+        f = gzip.GzipFile(fileobj=raw, mode="wb")
+        f.write(b'{"prompt": "a"}\n')
+        f.flush()
+        raw.flush()
+        # The process dies here, before the gzip trailer is written
+        assert list(AIAssistant.load_conversation(str(path))) == [{"prompt": "a"}]
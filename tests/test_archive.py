@@ -0,0 +1,62 @@
+from app.scraper.archive import ResponseArchive
+
+def _extract_numbers(html):
+    return [{'asset_id': part} for part in html.split(',')]
+
+def test_records_round_trip(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.record('https://example.com/?page=1', 'Authér'.encode('latin-1'), encoding='latin-1', page=1)
+    archive.record('https://example.com/?page=2', b'second', status=500, page=2)
+
+    entries = ResponseArchive(str(tmp_path)).entries()
+    assert [entry['page'] for entry in entries] == [1, 2]
+    assert archive.read_text(entries[0]) == 'Authér'
+    assert archive.read(entries[1]) == b'second'
+
+def test_segments_rotate_and_stay_readable(tmp_path):
+    archive = ResponseArchive(str(tmp_path), max_segment_bytes=1)
+    bodies = [f'page {i}'.encode() for i in range(3)]
+    for i, body in enumerate(bodies):
+        archive.record(f'https://example.com/?page={i}', body)
+
+    entries = archive.entries()
+    assert len({entry['segment'] for entry in entries}) == 3
+    assert [archive.read(entry) for entry in entries] == bodies
+    # Reopening continues in the last segment instead of overwriting the first
+    reopened = ResponseArchive(str(tmp_path), max_segment_bytes=1)
+    reopened.record('https://example.com/?page=3', b'page 3')
+    assert reopened.entries()[-1]['segment'] == 'segment-00003.gz'
+
+def test_tee_archives_streamed_body(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    chunks = [b'<table>', b'<tr></tr>', b'</table>']
+    assert list(archive.tee(iter(chunks), 'https://example.com/', page=1)) == chunks
+    entry, = archive.entries()
+    assert archive.read(entry) == b''.join(chunks)
+    assert entry['size'] == len(b''.join(chunks))
+
+def test_replay_extracts_in_archive_order(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.record('https://example.com/?page=1', b'1,2')
+    archive.record('https://example.com/?page=2', b'error', status=503)
+    archive.record('https://example.com/?page=3', b'3')
+
+    records = archive.replay_records(_extract_numbers, workers=2)
+    assert [record['asset_id'] for record in records] == ['1', '2', '3']
+
+def test_replay_uses_the_latest_response_per_page(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.record('https://example.com/?page=1', b'1,2', page=1)
+    archive.record('https://example.com/?page=2', b'3', page=2)
+    # A second run into the same directory
+    ResponseArchive(str(tmp_path)).record('https://example.com/?page=1', b'1,2,4', page=1)
+
+    records = archive.replay_records(_extract_numbers, workers=1)
+    assert [record['asset_id'] for record in records] == ['3', '1', '2', '4']
+
+def test_session_cookies_are_not_indexed(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    archive.record('https://example.com/', b'x', headers={'Content-Type': 'text/html', 'Set-Cookie': 'sid=secret'})
+    entry, = archive.entries()
+    assert entry['headers'] == {'Content-Type': 'text/html'}
+    assert 'secret' not in (tmp_path / 'index.jsonl').read_text()
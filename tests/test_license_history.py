@@ -0,0 +1,126 @@
+import os
+import pytest
+import requests
+from conftest import FakeResponse, FakeSite, license_table
+
+APP_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+
+def _nav(page, label=""):
+    return (f'<p>{label}</p><nav class="pagination"><a href="?page={page + 1}">{page + 1}</a></nav>'
+            f'<a class="next-page" href="?page={page + 1}">Next</a>')
+
+@pytest.fixture
+def make_scraper(monkeypatch, tmp_path):
+    # license_history is run from app/ and imports the scraper package from there
+    monkeypatch.syspath_prepend(APP_DIR)
+    from license_history import AdobeStockScraper
+    from scraper.throttle import AdaptiveThrottle
+
+    def make(render, **site_options):
+        scraper = AdobeStockScraper(str(tmp_path))
+        scraper.session = FakeSite(render, **site_options)
+        scraper.throttle = AdaptiveThrottle(initial_rate=1000.0, max_rate=1000.0,
+                                            initial_concurrency=4, max_concurrency=4)
+        return scraper
+    return make
+
+def _listing(pages, rows=2):
+    """pages pages of rows rows; only page 1 says how many pages there are"""
+    def render(page):
+        label = f"Page 1 of {pages}" if page == 1 else ""
+        return license_table(page, rows) + _nav(page, label)
+    return render
+
+def _asset_ids(assets):
+    return sorted(assets.column("asset_id"))
+
+def test_known_pages_are_fetched_concurrently(make_scraper):
+    scraper = make_scraper(_listing(5), delay=0.02)
+    assets = scraper.scrape_all_pages()
+
+    assert sorted(scraper.session.requested) == [1, 2, 3, 4, 5]
+    assert scraper.session.peak > 1
+    assert _asset_ids(assets) == [f"{page}-{i}" for page in range(1, 6) for i in range(2)]
+    assert scraper.pagination.total_pages == 5 and scraper.failed_pages == []
+
+def test_a_failed_known_page_is_retried_at_the_end(make_scraper):
+    failures = {3: 1}
+    render = _listing(4)
+
+    def flaky(page):
+        if failures.get(page):
+            failures[page] -= 1
+            raise ValueError("truncated page")
+        return render(page)
+
+    scraper = make_scraper(flaky)
+    assets = scraper.scrape_all_pages()
+    assert scraper.session.requested.count(3) > 1
+    assert scraper.failed_pages == []
+    assert _asset_ids(assets) == [f"{page}-{i}" for page in range(1, 5) for i in range(2)]
+
+def test_sequential_listing_ends_at_a_client_error(make_scraper):
+    def render(page):
+        return FakeResponse(404) if page > 2 else license_table(page) + _nav(page)
+
+    scraper = make_scraper(render)
+    assets = scraper.scrape_all_pages(parallel=False)
+    assert scraper.session.requested == [1, 2, 3]
+    assert scraper.failed_pages == []
+    assert _asset_ids(assets) == ["1-0", "2-0"]
+
+def test_sequential_failed_page_is_retried_after_the_rest(make_scraper):
+    failed = []
+
+    def render(page):
+        if page == 2 and not failed:
+            failed.append(page)
+            raise ValueError("bad gateway page")
+        return license_table(page) if page > 3 else license_table(page) + _nav(page)
+
+    scraper = make_scraper(render)
+    assets = scraper.scrape_all_pages(parallel=False, max_pages=4)
+    assert scraper.session.requested == [1, 2, 3, 4, 2]
+    assert scraper.failed_pages == []
+    assert _asset_ids(assets) == ["1-0", "2-0", "3-0", "4-0"]
+
+class _BrokenStream(FakeResponse):
+    """Delivers the first chunk of the body, then loses the connection"""
+
+    def iter_content(self, chunk_size=1):
+        body = self.text.encode()
+        yield body[:len(body) // 2]
+        raise requests.exceptions.ChunkedEncodingError("connection lost")
+
+def test_rows_of_a_partially_streamed_page_are_dropped(make_scraper):
+    broken = []
+
+    def render(page):
+        if page > 2:
+            return "<html></html>"
+        html = license_table(page, rows=20) + _nav(page)
+        if page == 2 and not broken:
+            broken.append(page)
+            return _BrokenStream(text=html)
+        return html
+
+    scraper = make_scraper(render)
+    assets = scraper.scrape_all_pages(stream=True, parallel=False)
+    assert scraper.session.requested == [1, 2, 3, 2]
+    assert scraper.failed_pages == []
+    # Page 2 only counts once, from its retry
+    assert _asset_ids(assets) == sorted(f"{page}-{i}" for page in (1, 2) for i in range(20))
+
+def test_first_page_is_streamed(make_scraper):
+    # One large page: well over the edges kept for reading the pagination controls
+    scraper = make_scraper(lambda page: license_table(page, rows=3000) if page == 1 else "<html></html>")
+    assets = scraper.scrape_all_pages(stream=True)
+    assert scraper.session.streamed == [1, 2]
+    assert len(assets) == 3000
+
+def test_streamed_first_page_still_plans_the_remaining_pages(make_scraper):
+    scraper = make_scraper(_listing(3, rows=2000))
+    assets = scraper.scrape_all_pages(stream=True)
+    assert sorted(scraper.session.streamed) == [1, 2, 3]
+    assert scraper.pagination.total_pages == 3 and scraper.pagination.exact
+    assert len(assets) == 6000
@@ -0,0 +1,181 @@
+import asyncio
+import requests
+from bs4 import BeautifulSoup
+from conftest import FakePageAssistant, FakeResponse, FakeSite, license_table
+from app.scraper.adobe_stock import AdobeStockScraper
+from app.scraper.pagination import PageRun, Pagination, discover_pagination, fetch_pages
+from app.scraper.records import RecordBuffer
+from app.scraper.site_analyzer import SiteAnalyzer
+from app.scraper.throttle import AdaptiveThrottle
+
+URL = "https://example.com/licenses"
+
+def _nav(*links, label=""):
+    anchors = "".join(f'<a href="{href}"{attrs}>{text}</a>' for href, text, attrs in links)
+    return f'<html><body><p>{label}</p><nav class="pagination">{anchors}</nav></body></html>'
+
+def test_page_label_gives_an_exact_total():
+    html = _nav(("?page=2", "2", ""), ("?page=2", "Next", ""), label="Page 1 of 57")
+    pagination = discover_pagination(html, URL)
+    assert (pagination.scheme, pagination.param, pagination.total_pages) == ("page", "page", 57)
+    assert pagination.exact and pagination.random_access
+    assert pagination.pages()[-1] == 57
+    assert pagination.params(3) == {"page": 3}
+    assert not pagination.has_page(58)
+
+def test_result_count_label_and_rows_per_page():
+    html = _nav(("?p=2", "2", ""), label="Showing 1-50 of 1,234 results")
+    pagination = discover_pagination(html, URL)
+    assert (pagination.param, pagination.per_page, pagination.total_pages) == ("p", 50, 25)
+    # Without a range in the label, the rows found on the first page give the page size
+    pagination = discover_pagination(_nav(("?p=2", "2", ""), label="1,234 licenses"), URL, per_page=100)
+    assert pagination.total_pages == 13
+
+def test_counts_away_from_the_controls_are_ignored():
+    html = _nav(("?page=2", "2", ""), ("?page=3", "3", "")).replace(
+        "<body>", "<body><header>Cart (0 items)</header><div>menu</div>"
+    )
+    pagination = discover_pagination(html, URL, per_page=50)
+    assert pagination.total_pages == 3 and not pagination.exact
+    assert pagination.has_page(2) and pagination.has_page(4)
+
+    # Even next to the controls, a label total never undercuts the linked pages
+    pagination = discover_pagination(_nav(("?page=2", "2", ""), ("?page=3", "3", ""), label="20 items"),
+                                     URL, per_page=50)
+    assert pagination.total_pages == 3 and not pagination.exact
+
+def test_windowed_links_are_a_lower_bound_unless_there_is_a_last_link():
+    windowed = _nav(*[(f"?page={i}", str(i), "") for i in range(2, 6)], ("?page=2", "Next", ""))
+    pagination = discover_pagination(windowed, URL)
+    assert pagination.total_pages == 5 and not pagination.exact
+    assert pagination.has_page(6)
+
+    with_last = _nav(("?page=2", "2", ""), ("?page=40", "»»", ' rel="last"'))
+    pagination = discover_pagination(with_last, URL)
+    assert pagination.total_pages == 40 and pagination.exact
+
+def test_offset_scheme():
+    html = _nav(("?offset=25", "2", ""), ("?offset=50", "3", ""), ("?offset=475", "Last", ""))
+    pagination = discover_pagination(html, URL)
+    assert (pagination.scheme, pagination.per_page, pagination.total_pages) == ("offset", 25, 20)
+    assert pagination.exact
+    assert pagination.params(1) == {"offset": 0}
+    assert pagination.params(3) == {"offset": 50}
+
+def test_one_based_offsets():
+    html = _nav(*[(f"?start={offset}", str(i + 1), "") for i, offset in enumerate([1, 51, 101, 151])])
+    pagination = discover_pagination(html, URL, per_page=50)
+    assert (pagination.scheme, pagination.per_page, pagination.total_pages) == ("offset", 50, 4)
+    assert pagination.params(1) == {"start": 1}
+    assert pagination.params(4) == {"start": 151}
+
+def test_links_outside_pagination_controls_do_not_set_a_total():
+    for link in ('<a href="/?p=48213">A post</a>', '<a href="/?p=48213">48213</a>',
+                 '<a href="/archive?start=2024">2024</a>'):
+        pagination = discover_pagination(f"<html><body><table></table>{link}</body></html>", URL, per_page=50)
+        assert not pagination.random_access and pagination.total_pages is None
+        assert pagination.per_page == 50
+
+    # A label is still trusted, and a Next link still names the parameter
+    html = '<p>Page 1 of 3</p><a href="/?p=48213">A post</a><a href="?p=2">Next</a>'
+    pagination = discover_pagination(html, URL)
+    assert (pagination.param, pagination.total_pages) == ("p", 3) and pagination.random_access
+
+def test_cursor_scheme_is_walked_sequentially():
+    html = _nav(("?cursor=abc", "Next", ' rel="next"'), label="1,000 results")
+    pagination = discover_pagination(html, URL)
+    assert pagination.scheme == "cursor" and not pagination.random_access
+    assert pagination.params(1) == {}
+    assert not pagination.has_page(2)
+
+    pagination.observe(1, html, URL)
+    assert pagination.params(2) == {"cursor": "abc"}
+    assert not pagination.has_page(3)
+
+def test_site_analyzer_classifies_pagination_navs():
+    html = _nav(("?page=2", "2", ""), ("?page=9", "Last", "")) + '<nav class="breadcrumbs"><a href="/">Home</a></nav>'
+    analyzer = SiteAnalyzer(None)
+    analyzer.base_url = URL
+    navigation = analyzer._analyze_navigation(BeautifulSoup(html, "lxml"))
+    assert navigation["pagination"]["total_pages"] == 9
+    assert navigation["breadcrumbs"] == ["Home"]
+
+def test_fetch_pages_reports_errors_per_page():
+    def fetch(page):
+        if page == 3:
+            raise ValueError("boom")
+        return page * 10
+
+    results = {page: (result, error) for page, result, error in fetch_pages(fetch, range(1, 5), 2)}
+    assert results[1] == (10, None) and results[4] == (40, None)
+    assert isinstance(results[3][1], ValueError)
+
+def _listing(page):
+    """Five pages of two rows; only page 1 says how many pages there are"""
+    label = "Page 1 of 5" if page == 1 else ""
+    return license_table(page, rows=2) + _nav(("?page=2", "2", ""), label=label)
+
+def test_known_pages_are_scraped_concurrently():
+    scraper = AdobeStockScraper(FakePageAssistant())
+    scraper.session = FakeSite(_listing, delay=0.02)
+    scraper.throttle = AdaptiveThrottle(initial_rate=1000.0, max_rate=1000.0,
+                                        initial_concurrency=4, max_concurrency=4)
+    records = RecordBuffer()
+
+    asyncio.run(scraper._scrape_pages(URL, "licenses", records))
+    assert sorted(scraper.session.requested) == [1, 2, 3, 4, 5]
+    assert scraper.session.peak > 1
+    assert sorted(records.column("asset_id")) == [f"{page}-{i}" for page in range(1, 6) for i in range(2)]
+    assert isinstance(scraper.pagination, Pagination) and scraper.pagination.total_pages == 5
+
+def _reject_page_3(rows):
+    if any(row["asset_id"].startswith("3-") for row in rows):
+        return False, "bad rows"
+    return True, "ok"
+
+def test_invalid_known_page_is_recorded_and_stops_the_run():
+    scraper = AdobeStockScraper(FakePageAssistant(validate=_reject_page_3))
+    scraper.session = FakeSite(_listing)
+    scraper.throttle = AdaptiveThrottle(initial_rate=1000.0, max_rate=1000.0,
+                                        initial_concurrency=1, max_concurrency=1)
+    records = RecordBuffer()
+
+    asyncio.run(scraper._scrape_pages(URL, "licenses", records))
+    # Page 3 is retried once at the end; pages 4 and 5 are never started
+    assert scraper.session.requested == [1, 2, 3, 3]
+    assert scraper.failed_pages == [3]
+    assert sorted(records.column("asset_id")) == ["1-0", "1-1", "2-0", "2-1"]
+
+def _http_error(status):
+    try:
+        FakeResponse(status).raise_for_status()
+    except requests.HTTPError as e:
+        return e
+
+def test_page_run_skips_failed_pages_and_retries_them_once():
+    run = PageRun(max_consecutive_failures=3)
+    visited = []
+    outcomes = {2: [ValueError("boom"), None], 3: [ValueError("boom"), ValueError("again")],
+                5: [_http_error(404)]}
+    while (page := run.next_page()) is not None:
+        visited.append(page)
+        error = outcomes.get(page, [None]).pop(0)
+        if error is None:
+            run.succeeded(page)
+        else:
+            run.failed(page, error)
+    # 4 resets the failure streak, the 404 on 5 ends the walk, then 2 and 3 are retried
+    assert visited == [1, 2, 3, 4, 5, 2, 3]
+    assert run.failed_pages == [3]
+
+def test_page_run_stops_after_consecutive_failures_or_an_invalid_page():
+    run = PageRun(max_consecutive_failures=2)
+    run.failed(1, ValueError("boom"))
+    run.failed(2, ValueError("boom"))
+    assert run.next_page() == 1 and run.retrying
+
+    run = PageRun()
+    run.succeeded(1)
+    run.invalid(2, "bad rows")
+    run.skip_to(10)
+    assert not run.walking and run.next_page() == 2
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from app.scraper import profiling
+from app.scraper.profiling import SamplingProfiler, stage, staged
+
+def _busy(seconds):
+    end = time.monotonic() + seconds
+    data = []
+    while time.monotonic() < end:
+        data.append(bytearray(1024))
+    return data
+
+def test_stage_is_free_when_not_profiling():
+    with stage('fetch'):
+        assert profiling._thread_stages == {}
+
+def test_samples_are_tagged_by_stage(tmp_path):
+    with SamplingProfiler(str(tmp_path), 'test', interval=0.001) as profiler:
+        with stage('parse'):
+            _busy(0.2)
+        with stage('export'):
+            assert profiling._thread_stages[threading.get_ident()] == 'export'
+
+    counts = profiler.stage_counts()
+    assert counts['parse'] > 0
+    parse_stacks = [stack for stack in profiler.stacks if stack[0] == 'parse']
+    assert any('_busy' in frame for stack in parse_stacks for frame in stack)
+    assert profiling._thread_stages == {}
+
+def test_reports_are_written(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), 'test', interval=0.001)
+    profiler.start()
+    with stage('thumbnail'):
+        kept = _busy(0.1)
+    collapsed, report = profiler.stop()
+
+    lines = open(collapsed).read().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any(line.startswith('thumbnail;') for line in lines)
+    text = open(report).read()
+    assert 'thumbnail' in text
+    assert 'test_profiling.py' in text  # allocations made by _busy
+    assert kept
+
+def test_staged_tags_only_while_producing():
+    seen = []
+    def produce():
+        for i in range(3):
+            seen.append(profiling._thread_stages.get(threading.get_ident()))
+            yield i
+
+    profiling._profiling = True
+    try:
+        for _ in staged('parse', produce()):
+            assert threading.get_ident() not in profiling._thread_stages
+    finally:
+        profiling._profiling = False
+    assert seen == ['parse'] * 3
+
+def test_interleaved_tasks_restore_their_own_stage():
+    async def tagged(delay):
+        with stage('ai'):
+            await asyncio.sleep(delay)
+
+    async def run():
+        # Blocks exit in the order they were entered, not the reverse
+        await asyncio.gather(tagged(0.01), tagged(0.02))
+        return threading.get_ident()
+
+    profiling._profiling = True
+    try:
+        with stage('parse'):
+            ident = asyncio.run(run())
+            assert profiling._thread_stages[ident] == 'parse'
+        assert ident not in profiling._thread_stages
+    finally:
+        profiling._profiling = False
@@ -0,0 +1,100 @@
+import tracemalloc
+from app.scraper.records import RecordBuffer
+
+def _rows(count):
+    for i in range(count):
+        yield {
+            'date': f"2024-01-{i % 28 + 1:02d}",
+            'author': f"Author {i % 50}",
+            'asset_id': str(100000 + i),
+            'license': "Standard",
+            'media_type': "Image",
+            'price': f"${i % 5}.99",
+            'thumbnail_url': f"https://example.com/thumbs/{i}.jpg"
+        }
+
+def test_iterates_as_records():
+    rows = list(_rows(10))
+    buffer = RecordBuffer()
+    buffer.extend(rows)
+    assert len(buffer) == 10
+    assert list(buffer) == rows
+    assert buffer[-1] == rows[-1]
+
+def test_missing_and_none_values_round_trip():
+    buffer = RecordBuffer()
+    buffer.append({'asset_id': '1', 'author': None})
+    buffer.append({'asset_id': '2', 'extra': 'x'})
+    assert buffer[0] == {'asset_id': '1', 'author': None}
+    assert buffer[1] == {'asset_id': '2', 'extra': 'x'}
+    assert 'thumbnail_url' not in buffer[0]
+
+def test_to_dataframe_matches_dict_rows():
+    import pandas as pd
+    rows = list(_rows(100))
+    buffer = RecordBuffer()
+    buffer.extend(rows)
+    df = buffer.to_dataframe()
+    expected = pd.DataFrame(rows)
+    assert list(df.columns) == [c for c in buffer.fields if c in expected.columns]
+    assert df['author'].astype(object).tolist() == expected['author'].tolist()
+    assert df['asset_id'].tolist() == expected['asset_id'].tolist()
+
+def test_uses_less_memory_than_dicts():
+    count = 20000
+    tracemalloc.start()
+    rows = list(_rows(count))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del rows
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    buffer = RecordBuffer()
+    buffer.extend(_rows(count))
+    buffer_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert buffer_bytes * 2 < dict_bytes
+
+def test_truncate_drops_trailing_records():
+    rows = list(_rows(5))
+    buffer = RecordBuffer()
+    buffer.extend(rows)
+    buffer.truncate(2)
+    assert list(buffer) == rows[:2]
+    buffer.append(rows[4])
+    assert buffer[2] == rows[4]
+
+def test_set_column_adds_and_replaces_values():
+    buffer = RecordBuffer()
+    buffer.extend([{'asset_id': '1', 'author': 'a'}, {'asset_id': '2', 'author': 'b'}])
+    buffer.set_column('thumbnail_jpeg_path', ['/t/1.jpg', None])
+    buffer.set_column('author', ['c', 'c'])
+
+    assert buffer[0] == {'asset_id': '1', 'author': 'c', 'thumbnail_jpeg_path': '/t/1.jpg'}
+    assert buffer[1]['thumbnail_jpeg_path'] is None
+    assert buffer.column('author') == ['c', 'c']
+
+def test_map_column_changes_values_in_place():
+    buffer = RecordBuffer()
+    buffer.extend([{'asset_id': '1', 'date': '01/02/2024', 'price': '$1'},
+                   {'asset_id': '2', 'date': None},
+                   {'asset_id': '3', 'date': '2024-01-02'},
+                   {'asset_id': '4'}])
+    buffer.map_column('date', lambda value: value and value.replace('01/02/2024', '2024-01-02'))
+    buffer.map_column('asset_id', int)
+
+    assert buffer.column('date') == ['2024-01-02', None, '2024-01-02', None]
+    assert 'date' not in buffer[3]
+    assert buffer.column('asset_id') == [1, 2, 3, 4]
+    assert buffer[0] == {'asset_id': 1, 'date': '2024-01-02', 'price': '$1'}
+
+def test_standardize_dates_converts_a_buffer():
+    from app.utils.data_transformer import DataTransformer
+
+    rows = [{'asset_id': '1', 'date': 'Jan 2, 2024'}, {'asset_id': '2', 'date': 'n/a'}, {'asset_id': '3'}]
+    buffer = RecordBuffer()
+    buffer.extend(rows)
+    assert DataTransformer.standardize_dates(buffer, 'date') is buffer
+    assert list(buffer) == DataTransformer.standardize_dates(rows, 'date')
+    assert buffer.column('date') == ['2024-01-02', 'n/a', None]
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from conftest import FakePageAssistant, FakeSite, license_table
+from app.scraper.adobe_stock import AdobeStockScraper
+from app.scraper.records import RecordBuffer
+from app.scraper.result_store import ResultStore
+from app.scraper.throttle import AdaptiveThrottle
+
+def _record(asset_id, date="2024-01-01", license="Standard", **fields):
+    record = {'asset_id': asset_id, 'date': date, 'license': license,
+              'author': 'Author', 'media_type': 'Image', 'price': '$0.99'}
+    record.update(fields)
+    return record
+
+def test_upsert_is_keyed_by_asset_date_license(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.upsert([_record("1"), _record("1", license="Extended"), _record("2")])
+    store.upsert([_record("1", price="$1.99")])
+
+    assert store.count() == 3
+    rows = store.find(asset_id="1")
+    assert {row['license'] for row in rows} == {"Standard", "Extended"}
+    assert [row['price'] for row in rows if row['license'] == "Standard"] == ["$1.99"]
+
+def test_changed_since_ignores_unchanged_rows(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.upsert([_record("1"), _record("2")])
+    time.sleep(1.1)
+    checkpoint = time.strftime("%Y-%m-%dT%H:%M:%S")
+    store.upsert([_record("1"), _record("2", author="Someone else")])
+
+    assert [row['asset_id'] for row in store.changed_since(checkpoint)] == ["2"]
+
+def test_queries_and_snapshot(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.upsert([
+        _record("1", date="2024-01-01", author="A"),
+        _record("2", date="2024-02-01", author="B", thumbnail_hash="abc")
+    ])
+
+    assert [row['asset_id'] for row in store.find(author="B")] == ["2"]
+    assert [row['asset_id'] for row in store.find(since="2024-01-15")] == ["2"]
+    assert store.find(asset_id="2")[0]['extra'] == '{"thumbnail_hash": "abc"}'
+
+    path = store.export_snapshot(str(tmp_path / "snapshot.csv"), format='csv')
+    with open(path) as f:
+        assert len(f.read().splitlines()) == 3
+
+def _listing(page):
+    next_link = f'<a class="next-page" href="?page={page + 1}">Next</a>' if page < 3 else ""
+    return license_table(page) + next_link
+
+def _fail_page_2_once():
+    """Fails the structure analysis of page 2 once"""
+    failed = []
+
+    def analyze(html_content):
+        if "2-0" in html_content and not failed:
+            failed.append(True)
+            raise ValueError("model overloaded")
+        return {}
+    return analyze
+
+def test_retried_pages_are_stored(tmp_path):
+    scraper = AdobeStockScraper(FakePageAssistant(analyze=_fail_page_2_once()))
+    scraper.session = FakeSite(_listing)
+    scraper.throttle = AdaptiveThrottle(initial_rate=1000.0, max_rate=1000.0)
+    scraper.result_store = ResultStore(str(tmp_path / "results.sqlite3"))
+    records = RecordBuffer()
+
+    asyncio.run(scraper._scrape_pages("https://example.com/list", "licenses", records))
+    assert scraper.failed_pages == []
+    assert sorted(records.column("asset_id")) == ["1-0", "2-0", "3-0"]
+    assert sorted(row["asset_id"] for row in scraper.result_store.find()) == ["1-0", "2-0", "3-0"]
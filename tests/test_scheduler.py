@@ -0,0 +1,138 @@
+import time
+from app.scraper import scheduler as scheduler_module
+from app.scraper.scheduler import JobScheduler, SiteJob, page_tasks
+from app.scraper.throttle import AdaptiveThrottle
+
+def _job(name, url, log, pages=3, duration=0.02, **kwargs):
+    def tasks():
+        results = []
+        for page in range(pages):
+            results.append((yield lambda page=page: _work(log, name, page, duration)))
+        return results
+    return SiteJob(name, url, tasks(), **kwargs)
+
+def _work(log, name, page, duration):
+    start = time.monotonic()
+    time.sleep(duration)
+    log.append((name, start, time.monotonic()))
+    return page
+
+def _fast_scheduler(**kwargs):
+    scheduler = JobScheduler(**kwargs)
+    for domain in ("a.example", "b.example"):
+        scheduler.throttles[domain] = AdaptiveThrottle(initial_rate=1000.0)
+    return scheduler
+
+def test_jobs_run_to_completion_with_results():
+    log = []
+    scheduler = _fast_scheduler(max_workers=4)
+    scheduler.add_job(_job("a", "https://a.example/x", log))
+    scheduler.add_job(_job("b", "https://b.example/x", log))
+    jobs = scheduler.run()
+    assert [job.result for job in jobs] == [[0, 1, 2], [0, 1, 2]]
+    assert all(job.done and job.last_run for job in jobs)
+
+def test_domain_concurrency_is_respected():
+    log = []
+    scheduler = _fast_scheduler(max_workers=4)
+    scheduler.add_job(_job("a1", "https://a.example/1", log))
+    scheduler.add_job(_job("a2", "https://a.example/2", log))
+    scheduler.add_job(_job("b", "https://b.example/x", log))
+    scheduler.run()
+
+    same_domain = sorted((start, end) for name, start, end in log if name.startswith("a"))
+    for (_, end), (start, _) in zip(same_domain, same_domain[1:]):
+        assert start >= end
+    # Another domain's requests overlap with the busy one
+    b_start = min(start for name, start, _ in log if name == "b")
+    assert b_start < same_domain[-1][0]
+
+def test_higher_priority_job_goes_first():
+    log = []
+    scheduler = _fast_scheduler(max_workers=1)
+    scheduler.add_job(_job("low", "https://a.example/1", log, pages=1))
+    scheduler.add_job(_job("high", "https://a.example/2", log, pages=1, priority=5))
+    scheduler.run()
+    assert [name for name, _, _ in log] == ["high", "low"]
+
+def test_fair_share_interleaves_jobs():
+    log = []
+    scheduler = _fast_scheduler(max_workers=1)
+    scheduler.add_job(_job("x", "https://a.example/1", log, pages=4, duration=0))
+    scheduler.add_job(_job("y", "https://a.example/2", log, pages=2, duration=0, share=0.5))
+    scheduler.run()
+    assert [name for name, _, _ in log] == ["x", "y", "x", "x", "y", "x"]
+
+def test_task_errors_are_thrown_into_the_job():
+    def tasks():
+        try:
+            yield lambda: 1 / 0
+        except ZeroDivisionError:
+            return "recovered"
+
+    scheduler = _fast_scheduler()
+    scheduler.add_job(SiteJob("z", "https://a.example/", tasks()))
+    assert scheduler.run()[0].result == "recovered"
+
+def test_blocked_domain_does_not_hold_workers():
+    log = []
+    scheduler = _fast_scheduler(max_workers=1)
+    scheduler.throttles["a.example"].on_throttle(retry_after=0.2)
+    scheduler.add_job(_job("a", "https://a.example/1", log, pages=1, priority=5))
+    scheduler.add_job(_job("b", "https://b.example/1", log, pages=3, duration=0))
+    started = time.monotonic()
+    scheduler.run()
+
+    assert [name for name, _, _ in log] == ["b", "b", "b", "a"]
+    assert log[-1][1] - started >= 0.2
+
+class FlakyScraper:
+    max_consecutive_failures = 3
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.calls = []
+
+    def _fetch_page(self, url, page, max_retries=3):
+        self.calls.append(page)
+        if self.failures.get(page):
+            self.failures[page] -= 1
+            raise Exception("503 response")
+        return str(page)
+
+    def _extract_data(self, html_content, selectors):
+        return [{"page": int(html_content)}]
+
+    def _has_next_page(self, html_content):
+        return int(html_content) < 3
+
+def test_failed_pages_are_retried_as_tasks(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "backoff_delay", lambda attempt: 0.01)
+    scraper = FlakyScraper({2: 3})
+    scheduler = _fast_scheduler()
+    scheduler.add_job(SiteJob("a", "https://a.example/", page_tasks(scraper, "https://a.example/", [])))
+    records = scheduler.run()[0].result
+
+    assert scraper.calls == [1, 2, 2, 2, 3, 2]
+    assert [record["page"] for record in records] == [1, 3, 2]
+    assert scraper.failed_pages == []
+
+def test_site_configs_are_extracted_with_their_data_mapping(tmp_path):
+    import json
+    from app.scraper.scheduler import load_site_jobs
+
+    (tmp_path / "shop.json").write_text(json.dumps({
+        "base_url": "https://shop.example",
+        "license_history_url": "/orders",
+        "selectors": {"row": "tr", "columns": "td"},
+        "data_mapping": {"asset_id": 0, "price": 2}
+    }))
+    (tmp_path / "unmapped.json").write_text(json.dumps({
+        "base_url": "https://other.example", "selectors": {"row": "tr"}
+    }))
+    jobs = load_site_jobs(str(tmp_path), _fast_scheduler())
+    assert [job.name for job in jobs] == ["shop"]
+
+    html = "<table><tr><td>7</td><td>Poster</td><td>$3</td></tr><tr><td>short</td></tr></table>"
+    scraper = jobs[0].scraper
+    assert scraper._extract_data(html, ["tr", "td", "img"]) == [{"asset_id": "7", "price": "$3"}]
@@ -0,0 +1,33 @@
+from app.scraper.streaming import iter_row_elements, iter_rows
+
+def _chunks(html: bytes, size: int = 7):
+    for i in range(0, len(html), size):
+        yield html[i:i + size]
+
+ROW = ("<tr><td>2024-01-0{i}</td><td>Author</td><td>{i}</td><td>Standard</td>"
+       "<td>Image</td><td>$0.99</td><td><img src='/t/{i}.jpg'></td></tr>")
+PAGE = ("<html><body><table><tr><th>Date</th></tr>"
+        + "".join(ROW.format(i=i) for i in range(1, 4))
+        + "</table></body></html>").encode()
+
+def test_rows_are_emitted_across_chunk_boundaries():
+    rows = list(iter_rows(_chunks(PAGE)))
+    assert [row['asset_id'] for row in rows] == ['1', '2', '3']
+    assert rows[0] == {
+        'date': '2024-01-01', 'author': 'Author', 'asset_id': '1', 'license': 'Standard',
+        'media_type': 'Image', 'price': '$0.99', 'thumbnail_url': '/t/1.jpg'
+    }
+
+def test_processed_rows_are_released():
+    html = ("<table>" + "".join(ROW.format(i=i) for i in range(50)) + "</table>").encode()
+    sizes = []
+    for row in iter_row_elements(_chunks(html)):
+        sizes.append(len(row.getparent()))
+    # Only the current row (and at most the next, still being parsed) stays attached
+    assert len(sizes) == 50
+    assert max(sizes) <= 2
+
+def test_declared_encoding_is_used():
+    html = "<table><tr>" + "<td>Authér</td>" * 6 + "</tr></table>"
+    rows = list(iter_rows([html.encode('latin-1')], encoding='latin-1'))
+    assert rows[0]['author'] == 'Authér'
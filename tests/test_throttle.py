@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+import requests
+from conftest import FakePageAssistant, FakeResponse, FakeSite, license_table
+from app.scraper import throttle as throttle_module
+from app.scraper.adobe_stock import AdobeStockScraper
+from app.scraper.records import RecordBuffer
+from app.scraper.throttle import AdaptiveThrottle, fetch_with_backoff, parse_retry_after
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(throttle_module.time, 'sleep', recorded.append)
+    return recorded
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_additive_increase_multiplicative_decrease():
+    throttle = AdaptiveThrottle(initial_rate=1.0, rate_increase=0.5, max_rate=10.0)
+    throttle.on_success(0.1)
+    throttle.on_success(0.1)
+    assert throttle.rate == pytest.approx(2.0)
+    assert throttle.concurrency > 1.0
+
+    throttle.on_throttle()
+    assert throttle.rate == pytest.approx(1.0)
+    assert throttle.concurrency >= 1.0
+
+def test_latency_spike_backs_off():
+    throttle = AdaptiveThrottle(initial_rate=2.0, latency_factor=2.0)
+    throttle.on_success(0.1)
+    rate = throttle.rate
+    throttle.on_success(1.0)
+    assert throttle.rate == pytest.approx(rate / 2)
+
+def test_fetch_honors_retry_after(sleeps):
+    session = FakeSession([FakeResponse(429, {'Retry-After': '7'}), FakeResponse(200)])
+    throttle = AdaptiveThrottle(initial_rate=100.0)
+    response = fetch_with_backoff(session, "https://example.com", throttle)
+    assert response.status_code == 200
+    assert session.calls == 2
+    assert max(sleeps) >= 7
+
+def test_fetch_gives_up_after_max_retries(sleeps):
+    session = FakeSession([FakeResponse(503)] * 3)
+    with pytest.raises(Exception, match="after 3 attempts"):
+        fetch_with_backoff(session, "https://example.com", AdaptiveThrottle(initial_rate=100.0))
+
+def test_client_errors_are_not_retried(sleeps):
+    session = FakeSession([FakeResponse(404)])
+    with pytest.raises(requests.HTTPError):
+        fetch_with_backoff(session, "https://example.com", AdaptiveThrottle(initial_rate=100.0))
+    assert session.calls == 1
+
+def test_config_limits_are_caps_unless_max_is_set():
+    throttle = AdaptiveThrottle.from_config({'requests_per_minute': 30, 'concurrent_requests': 2})
+    for _ in range(50):
+        throttle.on_success(0.1)
+    assert throttle.rate == pytest.approx(0.5)
+    assert throttle.in_flight_limit == 2
+
+    throttle = AdaptiveThrottle.from_config({'requests_per_minute': 30, 'max_requests_per_minute': 120})
+    for _ in range(50):
+        throttle.on_success(0.1)
+    assert throttle.rate == pytest.approx(2.0)
+
+def _listing(page):
+    if page > 2:
+        return FakeResponse(404)
+    return license_table(page) + f'<a class="next-page" href="?page={page + 1}">Next</a>'
+
+def test_listing_ends_at_a_client_error():
+    scraper = AdobeStockScraper(FakePageAssistant())
+    scraper.session = FakeSite(_listing)
+    scraper.throttle = AdaptiveThrottle(initial_rate=1000.0, max_rate=1000.0)
+    records = RecordBuffer()
+    asyncio.run(scraper._scrape_pages("https://example.com/list", "licenses", records))
+    assert sorted(scraper.session.requested) == [1, 2, 3]
+    assert scraper.failed_pages == []
+    assert len(records) == 2
@@ -0,0 +1,58 @@
+import io
+import os
+from PIL import Image
+from app.scraper.records import RecordBuffer
+from app.scraper.thumbnail_processing import ThumbnailProcessor, variant_field
+from app.scraper.thumbnail_store import ThumbnailStore
+
+def _image_bytes(size, mode='RGB', color=(200, 30, 30), format='PNG'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+def test_variants_are_fixed_size_and_recorded(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.put('1', _image_bytes((300, 120)), content_type='image/png')
+    store.put('2', _image_bytes((40, 90), 'RGBA', (0, 0, 255, 128)), content_type='image/png')
+    processor = ThumbnailProcessor(store, {'small': (64, 'WEBP'), 'excel': (48, 'JPEG')}, workers=2)
+
+    assert processor.process() == 2
+    records = processor.annotate([{'asset_id': '1'}, {'asset_id': '2'}, {'asset_id': '3'}])
+    for record in records[:2]:
+        with Image.open(record[variant_field('small')]) as image:
+            assert (image.format, image.size) == ('WEBP', (64, 64))
+        with Image.open(record[variant_field('excel')]) as image:
+            assert (image.format, image.mode, image.size) == ('JPEG', 'RGB', (48, 48))
+    assert records[2][variant_field('small')] is None
+
+def test_processed_blobs_are_skipped(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.put('1', _image_bytes((100, 100)))
+    store.put('2', _image_bytes((100, 100)))  # same image, one blob
+    processor = ThumbnailProcessor(store, {'small': (32, 'JPEG')}, workers=1)
+
+    assert processor.process() == 1
+    assert processor.process() == 0
+    store.put('3', _image_bytes((50, 50), color=(0, 0, 0)))
+    assert processor.process() == 1
+
+def test_unreadable_images_are_reported_not_raised(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.put('1', b'not an image')
+    assert ThumbnailProcessor(store, workers=1).process() == 0
+
+def test_contact_sheets_are_paged_per_media_type(tmp_path):
+    store = ThumbnailStore(str(tmp_path / 'thumbs'))
+    records = RecordBuffer()
+    for i in range(5):
+        store.put(str(i), _image_bytes((20, 20), color=(i * 40, 0, 0)))
+        records.append({'asset_id': str(i), 'media_type': 'Image' if i < 3 else 'Vector Art'})
+    processor = ThumbnailProcessor(store, {'jpeg': (16, 'JPEG')}, workers=2)
+    processor.process()
+
+    sheets = processor.contact_sheets(records, str(tmp_path / 'sheets'), columns=2, rows=1)
+    assert [os.path.basename(path) for path in sheets] == [
+        'contact_sheet_image_001.jpg', 'contact_sheet_image_002.jpg', 'contact_sheet_vector_art_001.jpg'
+    ]
+    with Image.open(sheets[0]) as sheet:
+        assert sheet.size == (32, 32)
@@ -0,0 +1,51 @@
+import os
+from app.scraper.thumbnail_store import ThumbnailStore
+
+def test_put_shards_and_indexes(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    path = store.put("123", b"image-bytes", url="https://example.com/a.jpg", etag='"v1"')
+
+    assert store.has("123")
+    assert not store.has("456")
+    assert os.path.exists(path)
+    assert os.path.relpath(path, str(tmp_path)).count(os.sep) == 2
+    entry = store.lookup("123")
+    assert entry['path'] == path
+    assert entry['size'] == len(b"image-bytes")
+    assert entry['etag'] == '"v1"'
+
+def test_identical_images_are_stored_once(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    first = store.put("1", b"same", content_type="image/png")
+    second = store.put("2", b"same", content_type="image/png")
+
+    assert first == second
+    assert first.endswith(".png")
+    assert len(list(store.iter_blobs())) == 1
+
+def test_verify_and_collect_garbage(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    kept = store.put("1", b"kept")
+    dropped = store.put("2", b"dropped")
+    store.remove("2")
+
+    assert store.collect_garbage() == 1
+    assert not os.path.exists(dropped)
+    assert store.verify(check_hash=True) == []
+
+    os.remove(kept)
+    assert store.verify() == [{'hash': store.lookup("1")['hash'], 'reason': 'missing'}]
+
+def test_flat_files_are_imported_once(tmp_path):
+    (tmp_path / "111.jpg").write_bytes(b"legacy")
+    (tmp_path / "222.jpg").write_bytes(b"stale")
+    store = ThumbnailStore(str(tmp_path))
+    current = store.put("222", b"current")
+
+    assert store.import_flat_files() == 2
+    assert not os.path.exists(tmp_path / "111.jpg")
+    assert not os.path.exists(tmp_path / "222.jpg")
+    with open(store.get_path("111"), "rb") as f:
+        assert f.read() == b"legacy"
+    assert store.get_path("222") == current
+    assert store.import_flat_files() == 0